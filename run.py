@@ -1,13 +1,18 @@
 import os
 import sys
-import subprocess
+
+# Start WhisperWriter in this process instead of spawning a second interpreter for main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+if '--profile-startup' in sys.argv or '--profile-startup-json' in sys.argv:
+    # Enable before the app is imported so its imports are timed, too
+    from startup_profile import StartupProfiler
+    StartupProfiler.enable()
+
 from dotenv import load_dotenv
 
 print('Starting WhisperWriter...')
 load_dotenv()
 
-try:
-    subprocess.run([sys.executable, os.path.join('src', 'main.py')], shell=True, check=True)
-except subprocess.CalledProcessError as e:
-    print(f"Failed to start WhisperWriter: {e}")
-    sys.exit(1)
\ No newline at end of file
+import main
+main.main(sys.argv[1:])
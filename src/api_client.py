@@ -0,0 +1,137 @@
+import io
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+from utils import ConfigManager
+
+# Content types of the supported upload formats
+UPLOAD_CONTENT_TYPES = {
+    'flac': 'audio/flac',
+    'opus': 'audio/ogg',
+    'wav': 'audio/wav',
+}
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def encode_audio(audio_data, sample_rate=16000, upload_format='flac'):
+    """
+    Encode mono audio in memory for upload.
+
+    FLAC is lossless and roughly halves the size of 16-bit PCM; Opus is lossy and much
+    smaller. Falls back to WAV if soundfile (libsndfile) cannot encode the format.
+
+    :return: Tuple of (file name, encoded bytes, content type), as expected by httpx
+    """
+    if audio_data.dtype != np.int16:
+        audio_data = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+
+    if upload_format in ('flac', 'opus'):
+        try:
+            import soundfile as sf
+
+            buffer = io.BytesIO()
+            if upload_format == 'flac':
+                sf.write(buffer, audio_data, sample_rate, format='FLAC', subtype='PCM_16')
+                return 'audio.flac', buffer.getvalue(), UPLOAD_CONTENT_TYPES['flac']
+            sf.write(buffer, audio_data, sample_rate, format='OGG', subtype='OPUS')
+            return 'audio.ogg', buffer.getvalue(), UPLOAD_CONTENT_TYPES['opus']
+        except Exception as e:
+            ConfigManager.console_print(f'Could not encode audio as {upload_format} ({e}). Uploading WAV instead.')
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(audio_data.tobytes())
+    return 'audio.wav', buffer.getvalue(), UPLOAD_CONTENT_TYPES['wav']
+
+
+class APIError(Exception):
+    pass
+
+
+class APIClient:
+    """
+    Client for an OpenAI-compatible /audio/transcriptions endpoint.
+
+    Holds one pooled httpx.Client, so the TCP and TLS connection to the endpoint is reused
+    across dictations instead of being set up for every request. Use get_api_client() to get the
+    shared instance for the current configuration.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, base_url, api_key=None, timeout=30.0, max_retries=2):
+        """
+        Initialize the APIClient.
+
+        :param base_url: Base URL of the API, e.g. https://api.openai.com/v1
+        :param api_key: Bearer token sent with each request, if any
+        :param timeout: Seconds to wait for the connection and for the response
+        :param max_retries: Number of retries after a connection error, 429 or 5xx response
+        """
+        import httpx
+
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        headers = {'Authorization': f'Bearer {api_key}'} if api_key else {}
+        self.client = httpx.Client(base_url=self.base_url, headers=headers, timeout=httpx.Timeout(timeout),
+                                   limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300))
+        self.options = None
+
+    @classmethod
+    def get_api_client(cls):
+        """Return the shared client, creating it again if the API options have changed."""
+        api_options = ConfigManager.get_config_snapshot().model_options.api
+        options = (api_options.base_url, api_options.api_key or os.getenv('OPENAI_API_KEY'),
+                   api_options.timeout, api_options.max_retries)
+        with cls._lock:
+            if cls._instance is None or cls._instance.options != options:
+                if cls._instance is not None:
+                    cls._instance.close()
+                cls._instance = cls(*options)
+                cls._instance.options = options
+            return cls._instance
+
+    def transcribe(self, audio_file, data):
+        """
+        Post an encoded audio file and return the transcribed text.
+
+        :param audio_file: Tuple of (file name, bytes, content type)
+        :param data: Form fields such as model, language, prompt and temperature
+        """
+        import httpx
+
+        data = {key: str(value) for key, value in data.items() if value is not None}
+        for attempt in range(self.max_retries + 1):
+            delay = 0.5 * 2 ** attempt
+            try:
+                response = self.client.post('/audio/transcriptions', data=data, files={'file': audio_file})
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise APIError(f'Request to {self.base_url} failed: {e}') from e
+                ConfigManager.console_print(f'API request failed ({e}). Retrying in {delay:.1f} seconds...')
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.replace('.', '', 1).isdigit():
+                    delay = float(retry_after)
+                ConfigManager.console_print(f'API returned {response.status_code}. Retrying in {delay:.1f} seconds...')
+                time.sleep(delay)
+                continue
+            if response.status_code != 200:
+                raise APIError(f'API returned {response.status_code}: {response.text[:500]}')
+            return response.json()['text']
+
+    def close(self):
+        self.client.close()
+
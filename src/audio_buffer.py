@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    A fixed-size, preallocated ring of int16 samples between the audio callback and its reader.
+
+    The audio callback is the only writer and the recording loop the only reader, so the
+    positions are plain counters of the total samples written and read. If the reader falls
+    more than a full ring behind, the oldest samples are overwritten and skipped.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        """
+        Initialize the RingBuffer.
+
+        :param capacity: Number of samples the ring holds
+        :param dtype: numpy dtype of the samples
+        """
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.write_pos = 0
+        self.read_pos = 0
+        self._scratch = None
+
+    def write(self, samples):
+        """
+        Copy samples into the ring. Safe to call from the audio callback; never allocates.
+
+        :param samples: 1-D array of samples
+        """
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.write_pos += n - self.capacity
+            n = self.capacity
+
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.write_pos += n
+
+    def available(self):
+        """Return the number of samples written but not yet read."""
+        return min(self.write_pos - self.read_pos, self.capacity)
+
+    def seek_latest(self, n):
+        """
+        Position the reader so the next read starts n samples before the newest sample.
+
+        :param n: Number of already written samples to read again, at most the ring capacity
+        """
+        self.read_pos = max(self.write_pos - min(n, self.capacity), 0)
+
+    def read(self, n):
+        """
+        Consume the next n samples.
+
+        :param n: Number of samples to read; must not exceed available()
+        :return: A view into the ring, or into a reused scratch array if the samples wrap around
+        """
+        if self.write_pos - self.read_pos > self.capacity:
+            self.read_pos = self.write_pos - self.capacity  # Overrun, skip what was overwritten
+
+        start = self.read_pos % self.capacity
+        self.read_pos += n
+        if start + n <= self.capacity:
+            return self.data[start:start + n]
+
+        if self._scratch is None or len(self._scratch) < n:
+            self._scratch = np.empty(n, dtype=self.data.dtype)
+        first = self.capacity - start
+        self._scratch[:first] = self.data[start:]
+        self._scratch[first:n] = self.data[:n - first]
+        return self._scratch[:n]
+
+
+class AudioArena:
+    """
+    A preallocated, growable float32 arena that holds a recording ready for the model.
+
+    int16 frames are scaled into the arena as they are appended, so the finished recording
+    is a float32 view that can be passed to the model without any further copies.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize the AudioArena.
+
+        :param capacity: Number of samples to preallocate; the arena doubles when full
+        """
+        self.data = np.empty(capacity, dtype=np.float32)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, samples):
+        """
+        Scale int16 samples to [-1, 1) and write them at the end of the arena.
+
+        :param samples: 1-D int16 array
+        """
+        end = self.length + len(samples)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=np.float32)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+
+        np.multiply(samples, np.float32(1 / 32768.0), out=self.data[self.length:end], dtype=np.float32)
+        self.length = end
+
+    def view(self):
+        """Return a float32 view of the recording so far."""
+        return self.data[:self.length]
+
+    def clear(self):
+        """Forget the recording while keeping the allocated memory."""
+        self.length = 0
@@ -0,0 +1,186 @@
+import threading
+
+import numpy as np
+
+from audio_buffer import RingBuffer
+from resampling import Downmixer, PolyphaseResampler
+from utils import ConfigManager
+
+MAX_CAPTURE_CHANNELS = 8  # Some virtual devices report dozens of (duplicated) channels
+
+
+class ResampleWorker(threading.Thread):
+    """
+    A worker thread that turns the device's native audio into int16 mono at the target rate.
+
+    The audio callback only copies the interleaved native blocks into a raw ring and calls
+    notify(). The worker downmixes and resamples everything pending in one go, writes the
+    result into the capture's ring buffer and notifies the active recording.
+    """
+
+    def __init__(self, capture, raw_buffer, channels, input_rate):
+        super().__init__(daemon=True)
+        self.capture = capture
+        self.raw_buffer = raw_buffer
+        self.channels = channels
+        self.downmixer = Downmixer(channels)
+        self.resampler = PolyphaseResampler(input_rate, capture.sample_rate)
+        self.data_ready = threading.Event()
+        self.stopped = False
+
+    def notify(self):
+        self.data_ready.set()
+
+    def stop(self):
+        """Resample the remaining frames and wait for the worker to finish. Call after the stream has stopped."""
+        self.stopped = True
+        self.data_ready.set()
+        self.join()
+
+    def run(self):
+        while True:
+            self.data_ready.wait()
+            self.data_ready.clear()
+            self.process_pending()
+            if self.stopped:
+                # The stream has been stopped; resample the blocks it wrote since the read above
+                self.process_pending()
+                return
+
+    def process_pending(self):
+        """Downmix and resample all complete native frames in the raw ring."""
+        pending = self.raw_buffer.available() // self.channels * self.channels
+        if not pending:
+            return
+        block = self.raw_buffer.read(pending).reshape(-1, self.channels)
+        output = self.resampler.process(self.downmixer.process(block))
+        self.capture.audio_buffer.write(np.clip(output, -32768, 32767).astype(np.int16))
+        on_data = self.capture.on_data
+        if on_data:
+            on_data()
+
+
+class AudioCapture:
+    """
+    An input stream that writes int16 mono frames into a ring buffer.
+
+    The audio callback only copies each block into the ring and notifies the active
+    recording, if any. When kept open between dictations (always-warm capture), the ring
+    always holds the most recent audio, so a recording can start from a pre-roll of the
+    last few hundred milliseconds instead of from the moment the device is opened.
+
+    With native_rate, the device is opened at its own sample rate and channel count, and a
+    ResampleWorker downmixes and resamples the audio instead of PortAudio or the OS.
+    """
+
+    def __init__(self, sample_rate, frame_size, device=None, pre_roll_ms=0, native_rate=False):
+        """
+        Initialize the AudioCapture.
+
+        :param sample_rate: Sample rate to open the device at
+        :param frame_size: Number of samples per block delivered by the callback
+        :param device: sounddevice device index or name, or None for the default device
+        :param pre_roll_ms: Milliseconds of audio from before begin() to include in the recording
+        :param native_rate: Whether to open the device at its native rate and resample in the app
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.device = device
+        self.native_rate = native_rate
+        self.resample_worker = None
+        self.pre_roll_samples = int(sample_rate * pre_roll_ms / 1000) // frame_size * frame_size
+        self.audio_buffer = RingBuffer(frame_size * 100 + self.pre_roll_samples)  # 3 seconds of headroom for the reader
+        self.stream = None
+        self.on_data = None
+
+    @classmethod
+    def from_config(cls, frame_size, pre_roll=False):
+        """
+        Create an AudioCapture from the recording options.
+
+        :param frame_size: Number of samples per block
+        :param pre_roll: Whether to keep the configured pre-roll
+        """
+        recording_options = ConfigManager.get_config_snapshot().recording_options
+        return cls(recording_options.sample_rate or 16000, frame_size, recording_options.sound_device,
+                   (recording_options.pre_roll_duration or 0) if pre_roll else 0,
+                   bool(recording_options.native_rate_capture))
+
+    def matches(self, other):
+        """Check whether another capture would open the same device with the same settings."""
+        return (self.sample_rate, self.frame_size, self.device, self.pre_roll_samples, self.native_rate) == \
+               (other.sample_rate, other.frame_size, other.device, other.pre_roll_samples, other.native_rate)
+
+    def is_open(self):
+        return self.stream is not None
+
+    def open(self):
+        """Open and start the input stream if it is not already running."""
+        if self.stream is not None:
+            return
+        import sounddevice as sd
+
+        input_rate, channels = self.sample_rate, 1
+        if self.native_rate:
+            try:
+                info = sd.query_devices(self.device, 'input')
+                input_rate = int(info['default_samplerate'])
+                channels = max(1, min(int(info['max_input_channels']), MAX_CAPTURE_CHANNELS))
+            except Exception as e:
+                ConfigManager.console_print(f'Could not query the input device ({e}). Opening it at {self.sample_rate} Hz.')
+
+        if input_rate == self.sample_rate and channels == 1:
+            self.stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16',
+                                         blocksize=self.frame_size, device=self.device,
+                                         callback=self._audio_callback)
+        else:
+            ConfigManager.console_print(f'Capturing {channels} channel(s) at {input_rate} Hz, '
+                                        f'resampling to mono at {self.sample_rate} Hz.')
+            blocksize = round(self.frame_size * input_rate / self.sample_rate)
+            raw_buffer = RingBuffer(blocksize * channels * 100)
+            self.resample_worker = ResampleWorker(self, raw_buffer, channels, input_rate)
+            self.resample_worker.start()
+            self.stream = sd.InputStream(samplerate=input_rate, channels=channels, dtype='int16',
+                                         blocksize=blocksize, device=self.device,
+                                         callback=self._native_callback)
+        self.stream.start()
+
+    def close(self):
+        """Stop and close the input stream."""
+        if self.stream is None:
+            return
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+        if self.resample_worker:
+            self.resample_worker.stop()
+            self.resample_worker = None
+
+    def begin(self, on_data):
+        """
+        Start handing audio to a recording, beginning with the pre-roll if the stream was already open.
+
+        :param on_data: Called from the audio callback, or the resample worker, after every block
+        :return: The RingBuffer the recording should read from
+        """
+        self.audio_buffer.seek_latest(self.pre_roll_samples if self.is_open() else 0)
+        self.on_data = on_data
+        return self.audio_buffer
+
+    def end(self):
+        """Stop notifying the recording. The stream keeps filling the ring if it stays open."""
+        self.on_data = None
+
+    def _audio_callback(self, indata, frames, time, status):
+        if status:
+            ConfigManager.console_print(f"Audio callback status: {status}")
+        self.audio_buffer.write(indata[:, 0])
+        on_data = self.on_data
+        if on_data:
+            on_data()
+
+    def _native_callback(self, indata, frames, time, status):
+        if status:
+            ConfigManager.console_print(f"Audio callback status: {status}")
+        self.resample_worker.raw_buffer.write(indata.ravel())
+        self.resample_worker.notify()
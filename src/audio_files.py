@@ -0,0 +1,36 @@
+import numpy as np
+
+# File extensions picked up when scanning a directory for audio clips
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.mp3', '.ogg', '.m4a')
+
+
+def load_audio(path, sample_rate=16000):
+    """
+    Decode an audio file to mono float32 samples at the given sample rate.
+    """
+    from faster_whisper import decode_audio
+    return decode_audio(path, sampling_rate=sample_rate)
+
+
+def synthetic_speech(seconds, sample_rate=16000, seed=0):
+    """
+    Generate a deterministic, speech-like float32 clip for benchmarks when no recordings are available.
+
+    The clip is a sequence of voiced "syllables" (a gliding pitch with harmonics and a
+    formant-like envelope) separated by short pauses, over a low noise floor.
+    """
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.002, int(seconds * sample_rate)).astype(np.float32)
+
+    position = 0
+    while position < len(audio):
+        length = int(rng.uniform(0.12, 0.35) * sample_rate)
+        t = np.arange(min(length, len(audio) - position)) / sample_rate
+        pitch = rng.uniform(90, 220) * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        syllable = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 8))
+        envelope = np.sin(np.pi * t / t[-1]) if len(t) > 1 else np.ones_like(t)
+        audio[position:position + len(t)] += (0.2 * envelope * syllable).astype(np.float32)
+        position += length + int(rng.uniform(0.05, 0.3) * sample_rate)
+
+    return np.clip(audio, -1.0, 1.0)
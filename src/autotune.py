@@ -0,0 +1,148 @@
+"""
+Hardware autotuner for the local Whisper model.
+
+Benchmarks combinations of compute_type and CPU thread count on a fixed clip and caches
+the fastest one per machine and model in src/autotune_profile.yaml. create_local_model()
+picks the cached profile up automatically when running on the CPU.
+
+Usage: python run.py --autotune [--autotune-clip path/to/clip.wav]
+   or: python src/autotune.py [--autotune-clip path/to/clip.wav]
+"""
+import argparse
+import os
+import platform
+import statistics
+import sys
+import time
+import yaml
+
+from audio_files import load_audio, synthetic_speech
+from utils import ConfigManager
+
+PROFILE_PATH = os.path.join('src', 'autotune_profile.yaml')
+COMPUTE_TYPES = ('int8', 'int8_float32', 'float32')
+
+
+def machine_id():
+    """Return a key identifying this machine's CPU configuration."""
+    return f'{platform.node()}|{platform.machine()}|{platform.processor()}|{os.cpu_count()}'
+
+
+def thread_candidates():
+    """Return the CPU thread counts to try: powers of two up to, and including, the core count."""
+    cpu_count = os.cpu_count() or 1
+    candidates = []
+    threads = 1
+    while threads < cpu_count:
+        candidates.append(threads)
+        threads *= 2
+    candidates.append(cpu_count)
+    return candidates
+
+
+def load_profiles(profile_path=PROFILE_PATH):
+    """Load all cached profiles, keyed by machine and then by model."""
+    if not os.path.isfile(profile_path):
+        return {}
+    try:
+        with open(profile_path, 'r') as file:
+            return yaml.safe_load(file) or {}
+    except yaml.YAMLError:
+        print('Error in autotune profile. Ignoring it.')
+        return {}
+
+
+def load_profile(model_name, profile_path=PROFILE_PATH):
+    """
+    Return the cached profile for this machine and model, or None if it has not been tuned.
+    """
+    return load_profiles(profile_path).get(machine_id(), {}).get(model_name)
+
+
+def save_profile(model_name, profile, profile_path=PROFILE_PATH):
+    """Store the profile for this machine and model, keeping the profiles of other machines."""
+    profiles = load_profiles(profile_path)
+    profiles.setdefault(machine_id(), {})[model_name] = profile
+    with open(profile_path, 'w') as file:
+        yaml.dump(profiles, file, default_flow_style=False)
+
+
+def benchmark_combination(model_name, compute_type, cpu_threads, audio, repeats=3):
+    """
+    Load the model with the given settings and return the median transcription time of the clip.
+    """
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_name, device='cpu', compute_type=compute_type, cpu_threads=cpu_threads, num_workers=1)
+
+    def run_once():
+        segments, _ = model.transcribe(audio, language=ConfigManager.get_config_value('model_options', 'common', 'language'),
+                                       condition_on_previous_text=False, temperature=0.0)
+        list(segments)
+
+    run_once()  # Warm-up
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        run_once()
+        timings.append(time.perf_counter() - start_time)
+    return statistics.median(timings)
+
+
+def autotune(clip_path=None, repeats=3):
+    """
+    Benchmark every candidate combination for the configured model and cache the fastest one.
+
+    :param clip_path: Audio file to benchmark on; a synthetic clip is used if not given
+    :param repeats: Number of timed runs per combination
+    :return: The profile that was saved
+    """
+    local_model_options = ConfigManager.get_config_section('model_options', 'local')
+    model_name = local_model_options.get('model_path') or local_model_options['model']
+    audio = load_audio(clip_path) if clip_path else synthetic_speech(10)
+    clip_seconds = len(audio) / 16000
+
+    print(f'Autotuning {model_name} on a {clip_seconds:.1f} s clip ({machine_id()})')
+    print(f'{"compute_type":<14} {"threads":>8} {"seconds":>10} {"RTF":>8}')
+
+    best = None
+    for compute_type in COMPUTE_TYPES:
+        for cpu_threads in thread_candidates():
+            try:
+                seconds = benchmark_combination(model_name, compute_type, cpu_threads, audio, repeats)
+            except Exception as e:
+                print(f'{compute_type:<14} {cpu_threads:>8} {"failed":>10}  {e}')
+                continue
+
+            print(f'{compute_type:<14} {cpu_threads:>8} {seconds:>10.3f} {seconds / clip_seconds:>8.3f}')
+            if best is None or seconds < best['seconds']:
+                best = {'compute_type': compute_type, 'cpu_threads': cpu_threads, 'seconds': seconds}
+
+    if best is None:
+        print('No combination could be benchmarked. The profile was not changed.')
+        return None
+
+    profile = {
+        'compute_type': best['compute_type'],
+        'cpu_threads': best['cpu_threads'],
+        'num_workers': 1,
+        'real_time_factor': round(best['seconds'] / clip_seconds, 4),
+    }
+    save_profile(model_name, profile)
+    print(f'Saved profile for {model_name}: {profile}')
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark and cache the fastest CPU settings for the local model.')
+    parser.add_argument('--autotune', action='store_true', help='Run the autotuner')
+    parser.add_argument('--autotune-clip', help='Audio file to benchmark on instead of a synthetic clip')
+    parser.add_argument('--autotune-repeats', type=int, default=3, help='Timed runs per combination')
+    args, _ = parser.parse_known_args(argv)
+
+    ConfigManager.initialize()
+    autotune(args.autotune_clip, args.autotune_repeats)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,137 @@
+"""
+Headless batch transcription of recorded audio files.
+
+Transcribes files with the same model options and post-processing as the app, without
+importing Qt or opening a microphone. Files are spread over a pool of worker processes,
+each with its own model instance, and every result is appended to a JSON-lines file as
+soon as it finishes. Files already in the output are skipped, so an interrupted run can
+be resumed by running the same command again.
+
+Usage: python src/batch.py recordings/ other.wav --output results.jsonl [--workers 4]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from audio_files import AUDIO_EXTENSIONS, load_audio
+from transcription import create_local_model, transcribe
+from utils import ConfigManager
+
+SAMPLE_RATE = 16000
+
+# The model of the current worker process, created once by init_worker()
+worker_model = None
+
+
+def find_audio_files(inputs):
+    """Expand the given files and directories into a sorted list of audio files."""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            paths.append(path)
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def load_completed(output_path):
+    """Return the set of files that already have a successful result in the output file."""
+    completed = set()
+    if not os.path.isfile(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interruption
+            if 'text' in record:
+                completed.add(record['path'])
+    return completed
+
+
+def init_worker(cpu_threads):
+    """Load the configuration and create this worker's model."""
+    global worker_model
+    ConfigManager.initialize()
+    ConfigManager.set_config_value(False, 'misc', 'print_to_terminal')
+    worker_model = create_local_model(cpu_threads=cpu_threads)
+
+
+def transcribe_file(path):
+    """Transcribe one file in a worker process and return its result record."""
+    try:
+        start_time = time.perf_counter()
+        audio = load_audio(path, SAMPLE_RATE)
+        text = transcribe(audio, worker_model)
+        processing_seconds = time.perf_counter() - start_time
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+
+    return {
+        'path': path,
+        'text': text,
+        'audio_seconds': round(len(audio) / SAMPLE_RATE, 3),
+        'processing_seconds': round(processing_seconds, 3),
+    }
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Transcribe audio files without the GUI.')
+    parser.add_argument('inputs', nargs='+', help='Audio files or directories to transcribe')
+    parser.add_argument('--output', default='transcriptions.jsonl', help='JSON-lines file to append results to')
+    parser.add_argument('--workers', type=int, default=max(1, cpu_count // 4),
+                        help='Number of worker processes, each with its own model')
+    parser.add_argument('--cpu-threads', type=int, default=0,
+                        help='CPU threads per worker (default: the available cores divided by the workers)')
+    args = parser.parse_args()
+
+    ConfigManager.initialize()
+    paths = find_audio_files(args.inputs)
+    completed = load_completed(args.output)
+    pending = [path for path in paths if path not in completed]
+    print(f'{len(paths)} files, {len(paths) - len(pending)} already done, {len(pending)} to transcribe.')
+    if not pending:
+        return
+
+    workers = max(1, min(args.workers, len(pending)))
+    cpu_threads = args.cpu_threads or max(1, cpu_count // workers)
+
+    start_time = time.perf_counter()
+    audio_seconds = 0.0
+    failed = 0
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                   initializer=init_worker, initargs=(cpu_threads,))
+    try:
+        futures = [executor.submit(transcribe_file, path) for path in pending]
+        with open(args.output, 'a', encoding='utf-8') as output:
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+
+                if 'error' in record:
+                    failed += 1
+                    print(f'[{done}/{len(pending)}] {record["path"]}: {record["error"]}', file=sys.stderr)
+                else:
+                    audio_seconds += record['audio_seconds']
+                    print(f'[{done}/{len(pending)}] {record["path"]}')
+    except KeyboardInterrupt:
+        print('Interrupted. Run the same command again to resume.', file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        sys.exit(1)
+    executor.shutdown()
+
+    elapsed = time.perf_counter() - start_time
+    print(f'Transcribed {len(pending) - failed} files ({audio_seconds:.0f} s of audio) in {elapsed:.1f} s '
+          f'with {workers} workers x {cpu_threads} threads. {failed} failed.')
+
+
+if __name__ == '__main__':
+    main()
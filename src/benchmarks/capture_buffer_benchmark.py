@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the capture path from the audio callback to the model input.
+
+Compares the previous deque/list path with the RingBuffer/AudioArena path on synthetic
+30 ms frames, reporting per-frame CPU time, the memory blocks still held afterwards and
+peak traced memory.
+
+Usage: python src/benchmarks/capture_buffer_benchmark.py [--seconds 60] [--sample-rate 16000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_buffer import RingBuffer, AudioArena
+
+
+def deque_path(frames, frame_size):
+    """The capture path before the preallocated buffers."""
+    audio_buffer = deque(maxlen=frame_size)
+    recording = []
+    for indata in frames:
+        audio_buffer.extend(indata[:, 0])
+        frame = np.array(list(audio_buffer), dtype=np.int16)
+        audio_buffer.clear()
+        recording.extend(frame)
+    audio_data = np.array(recording, dtype=np.int16)
+    return audio_data.astype(np.float32) / 32768.0
+
+
+def arena_path(frames, frame_size, sample_rate):
+    """The capture path through RingBuffer and AudioArena."""
+    audio_buffer = RingBuffer(frame_size * 100)
+    recording = AudioArena(sample_rate * 60)
+    for indata in frames:
+        audio_buffer.write(indata[:, 0])
+        while audio_buffer.available() >= frame_size:
+            recording.append(audio_buffer.read(frame_size))
+    return recording.view()
+
+
+def measure(name, func, frame_count):
+    """Run func once for timing and once under tracemalloc, and print a report line."""
+    start = time.process_time()
+    func()
+    cpu_time = time.process_time() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'lineno')
+    retained_blocks = sum(max(stat.count_diff, 0) for stat in stats)
+
+    print(f'{name:<8} {cpu_time / frame_count * 1e6:>12.2f} {retained_blocks:>16} {peak / 1024 / 1024:>14.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the audio capture buffer.')
+    parser.add_argument('--seconds', type=int, default=60, help='Length of the simulated recording')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='Sample rate of the simulated recording')
+    args = parser.parse_args()
+
+    frame_size = int(args.sample_rate * 0.03)
+    frame_count = args.seconds * 1000 // 30
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(-32768, 32767, size=(frame_size, 1), dtype=np.int16) for _ in range(frame_count)]
+
+    expected = deque_path(frames, frame_size)
+    actual = arena_path(frames, frame_size, args.sample_rate)
+    assert np.array_equal(expected, actual), 'Capture paths produced different audio'
+
+    print(f'{frame_count} frames of {frame_size} samples')
+    print(f'{"path":<8} {"us/frame":>12} {"retained blocks":>16} {"peak MiB":>14}')
+    measure('deque', lambda: deque_path(frames, frame_size), frame_count)
+    measure('arena', lambda: arena_path(frames, frame_size, args.sample_rate), frame_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the transcription history.
+
+Fills a temporary database with synthetic dictations through the batched background
+writer, reporting how long add() blocks the caller and the write throughput, then times
+searches for common, rare and prefix queries and for the most recent entries.
+
+Usage: python src/benchmarks/history_benchmark.py [--entries 300000] [--searches 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from history import TranscriptionHistory
+
+WORDS = ('the meeting report budget customer quarterly deadline email project schedule review '
+         'please send update call tomorrow morning thanks team draft proposal invoice follow '
+         'weekly status design launch feedback notes agenda summary release').split()
+
+
+def synthetic_entry(rng):
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+    return time.time(), text, rng.uniform(1, 20), 'base', rng.uniform(100, 2000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the transcription history.')
+    parser.add_argument('--entries', type=int, default=300000, help='Number of entries to store')
+    parser.add_argument('--searches', type=int, default=200, help='Number of searches per query')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        history = TranscriptionHistory(os.path.join(directory, 'history.sqlite3'), max_entries=0)
+        # A rare word in one entry out of 10,000
+        entries = [synthetic_entry(rng) for _ in range(args.entries)]
+        for index in range(0, args.entries, 10000):
+            entries[index] = entries[index][:1] + (entries[index][1] + ' kilimanjaro',) + entries[index][2:]
+
+        start = time.perf_counter()
+        enqueue_times = []
+        for entry in entries:
+            enqueue_start = time.perf_counter()
+            history.queue.put(entry)
+            enqueue_times.append(time.perf_counter() - enqueue_start)
+        history.flush(timeout=600)
+        elapsed = time.perf_counter() - start
+        print(f'Stored {history.count()} entries in {elapsed:.1f} s ({args.entries / elapsed:.0f}/s); '
+              f'add() blocked for {statistics.median(enqueue_times) * 1e6:.1f} us (median), '
+              f'{max(enqueue_times) * 1e3:.1f} ms at most')
+
+        print(f'{"query":<24} {"results":>8} {"p50 ms":>8} {"p95 ms":>8}')
+        for query in ('budget', 'quarterly report', 'kilimanjaro', 'prop', ''):
+            timings = []
+            for _ in range(args.searches):
+                search_start = time.perf_counter()
+                results = history.search(query, limit=50)
+                timings.append((time.perf_counter() - search_start) * 1000)
+            timings.sort()
+            print(f'{query or "(recent)":<24} {len(results):>8} {statistics.median(timings):>8.2f} '
+                  f'{timings[int(len(timings) * 0.95) - 1]:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
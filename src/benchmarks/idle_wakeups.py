@@ -0,0 +1,101 @@
+"""
+Measure how often a running WhisperWriter process wakes up while idle.
+
+Samples the context switches and CPU time of every thread of the process at the start and
+end of the measurement window (the process is not touched in between, so the tool adds no
+wakeups of its own) and reports wakeups per minute and CPU seconds per hour, in total and
+per thread. Run it against the app while it sits idle, before and after a change.
+
+Uses /proc on Linux and psutil elsewhere, if it is installed.
+
+Usage: python src/benchmarks/idle_wakeups.py PID [--duration 60] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+
+def sample_proc(pid):
+    """Return {thread id: (name, context switches, CPU seconds)} from /proc."""
+    clock_ticks = os.sysconf('SC_CLK_TCK')
+    threads = {}
+    for task in glob.glob(f'/proc/{pid}/task/*'):
+        try:
+            with open(os.path.join(task, 'comm')) as file:
+                name = file.read().strip()
+            switches = 0
+            with open(os.path.join(task, 'status')) as file:
+                for line in file:
+                    if line.startswith(('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches')):
+                        switches += int(line.split()[1])
+            with open(os.path.join(task, 'stat')) as file:
+                # The name in parentheses may contain spaces; the fields after it are fixed
+                fields = file.read().rsplit(')', 1)[1].split()
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / clock_ticks  # utime + stime
+        except (FileNotFoundError, ProcessLookupError):
+            continue  # The thread exited while being sampled
+        threads[int(os.path.basename(task))] = (name, switches, cpu_seconds)
+    return threads
+
+
+def sample_psutil(pid):
+    """Return the totals of the process as a single entry, for platforms without /proc."""
+    import psutil
+
+    process = psutil.Process(pid)
+    switches = process.num_ctx_switches()
+    cpu_times = process.cpu_times()
+    return {pid: ('(all threads)', switches.voluntary + switches.involuntary, cpu_times.user + cpu_times.system)}
+
+
+def measure(pid, duration):
+    sample = sample_proc if os.path.isdir(f'/proc/{pid}/task') else sample_psutil
+    before = sample(pid)
+    time.sleep(duration)
+    after = sample(pid)
+
+    minutes = duration / 60
+    results = []
+    for thread_id, (name, switches, cpu_seconds) in after.items():
+        _, switches_before, cpu_before = before.get(thread_id, (name, 0, 0.0))
+        results.append({
+            'thread': thread_id,
+            'name': name,
+            'wakeups_per_minute': (switches - switches_before) / minutes,
+            'cpu_seconds_per_hour': (cpu_seconds - cpu_before) / minutes * 60,
+        })
+    results.sort(key=lambda result: result['wakeups_per_minute'], reverse=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the idle wakeups and CPU time of a process.')
+    parser.add_argument('pid', type=int, help='Process id of the running app')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to measure for')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    try:
+        results = measure(args.pid, args.duration)
+    except ImportError:
+        sys.exit('This platform has no /proc; install psutil to measure the process.')
+
+    print(f'{"thread":>8} {"name":<20} {"wakeups/min":>12} {"CPU s/hour":>11}')
+    for result in results:
+        print(f'{result["thread"]:>8} {result["name"]:<20} {result["wakeups_per_minute"]:>12.1f} '
+              f'{result["cpu_seconds_per_hour"]:>11.2f}')
+    total_wakeups = sum(result['wakeups_per_minute'] for result in results)
+    total_cpu = sum(result['cpu_seconds_per_hour'] for result in results)
+    print(f'{"":>8} {"total":<20} {total_wakeups:>12.1f} {total_cpu:>11.2f}')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'pid': args.pid, 'duration': args.duration, 'wakeups_per_minute': total_wakeups,
+                       'cpu_seconds_per_hour': total_cpu, 'threads': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the text injection methods.
+
+Injects texts of increasing length with each method, once key by key (with the given delay
+between keystrokes), once in bulk and once with the adaptive strategy used by the app, and
+reports the throughput in characters per second.
+
+By default only the fake sink is measured, with a simulated cost per keystroke and per
+paste. Real methods type into the focused window: pass them with --methods and focus an
+empty text editor during the countdown.
+
+Usage: python src/benchmarks/input_benchmark.py [--methods fake pynput ydotool dotool clipboard]
+                                                [--lengths 20 200 2000] [--key-delay 0.005]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from input_simulation import FakeBackend, create_input_backend
+
+WORDS = 'the quick brown fox jumps over the lazy dog while whisper writes everything down'.split()
+
+
+def sample_text(length):
+    text = ''
+    index = 0
+    while len(text) < length:
+        text += WORDS[index % len(WORDS)] + ' '
+        index += 1
+    return text[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the text injection methods.')
+    parser.add_argument('--methods', nargs='+', default=['fake'], help='Input methods to measure')
+    parser.add_argument('--lengths', nargs='+', type=int, default=[20, 200, 2000], help='Text lengths in characters')
+    parser.add_argument('--key-delay', type=float, default=0.005, help='Seconds between keystrokes, as writing_key_press_delay')
+    parser.add_argument('--bulk-threshold', type=int, default=100, help='Adaptive strategy threshold, as bulk_input_threshold')
+    parser.add_argument('--fake-keystroke-ms', type=float, default=1.0, help='Simulated cost of a keystroke in the fake sink')
+    parser.add_argument('--fake-paste-ms', type=float, default=20.0, help='Simulated cost of a paste in the fake sink')
+    args = parser.parse_args()
+
+    if any(method != 'fake' for method in args.methods):
+        print('Focus an empty text editor; typing starts in 5 seconds...')
+        time.sleep(5)
+
+    print(f'{"method":<10} {"chars":>6} {"keys chars/s":>13} {"bulk chars/s":>13} {"adaptive chars/s":>17}')
+    for method in args.methods:
+        if method == 'fake':
+            backend = FakeBackend(args.fake_keystroke_ms / 1000, args.fake_paste_ms / 1000)
+        else:
+            try:
+                backend = create_input_backend(method)
+            except Exception as e:
+                print(f'Skipping {method}: {e}')
+                continue
+
+        try:
+            for length in args.lengths:
+                text = sample_text(length)
+                rates = []
+                for mode in ('keys', 'bulk', 'adaptive'):
+                    if mode == 'adaptive':
+                        mode = 'keys' if length <= args.bulk_threshold else 'bulk'
+                    start = time.perf_counter()
+                    if mode == 'keys':
+                        backend.type_keys(text + '\n', args.key_delay)
+                    else:
+                        backend.type_bulk(text + '\n')
+                    rates.append((length + 1) / (time.perf_counter() - start))
+                print(f'{method:<10} {length:>6} {rates[0]:>13.0f} {rates[1]:>13.0f} {rates[2]:>17.0f}')
+        except Exception as e:
+            print(f'{method} failed: {e}')
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    main()
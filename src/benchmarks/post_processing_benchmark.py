@@ -0,0 +1,87 @@
+"""
+Benchmark of the post-processing rule engine.
+
+Generates rules files with increasing numbers of whole-word replacements and applies them
+to a long synthetic transcription. Reports the time to load each rule set from YAML and
+from the compiled cache, and the time to apply it, next to a naive loop of one re.sub per
+rule (measured on the smaller rule sets only, as it grows with the number of rules).
+
+Usage: python src/benchmarks/post_processing_benchmark.py [--rules 100 1000 10000] [--words 20000]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from transcription import RuleSet
+
+NAIVE_MAX_RULES = 1000
+
+
+def random_word(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the post-processing rule engine.')
+    parser.add_argument('--rules', nargs='+', type=int, default=[100, 1000, 10000], help='Numbers of replacement rules')
+    parser.add_argument('--words', type=int, default=20000, help='Number of words in the transcription')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the fastest is reported')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [random_word(rng) for _ in range(max(args.rules) * 2)]
+    text = ' '.join(rng.choice(vocabulary) for _ in range(args.words))
+    print(f'Transcription of {args.words} words ({len(text)} characters)')
+    print(f'{"rules":>7} {"yaml load ms":>13} {"cached load ms":>15} {"apply ms":>9} {"naive apply ms":>15}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rule_count in args.rules:
+            phrases = rng.sample(vocabulary, rule_count)
+            # Mix single words with two-word phrases, as product names and spoken punctuation would be
+            replacements = {(phrase if index % 4 else f'{phrase} {rng.choice(vocabulary)}'): phrase.upper()
+                            for index, phrase in enumerate(phrases)}
+            path = os.path.join(directory, f'rules_{rule_count}.yaml')
+            with open(path, 'w') as file:
+                yaml.safe_dump({'replacements': replacements}, file)
+
+            start = time.perf_counter()
+            RuleSet.from_file(path)
+            yaml_load = time.perf_counter() - start
+            re.purge()  # Compile the regex again instead of taking it from the re module's cache
+            start = time.perf_counter()
+            rule_set = RuleSet.from_file(path)
+            cached_load = time.perf_counter() - start
+
+            apply_time = min(timed(rule_set.apply, text) for _ in range(args.repeat))
+
+            naive = ''
+            if rule_count <= NAIVE_MAX_RULES:
+                naive_rules = [(re.compile(rf'(?<!\w){re.escape(phrase)}(?!\w)', re.IGNORECASE), replacement)
+                               for phrase, replacement in replacements.items()]
+
+                def apply_naive(text):
+                    for regex, replacement in naive_rules:
+                        text = regex.sub(replacement, text)
+                    return text
+
+                naive = f'{timed(apply_naive, text) * 1000:.1f}'
+            print(f'{rule_count:>7} {yaml_load * 1000:>13.1f} {cached_load * 1000:>15.1f} '
+                  f'{apply_time * 1000:>9.1f} {naive:>15}')
+
+
+def timed(function, text):
+    start = time.perf_counter()
+    function(text)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Load test for the local transcription server (src/transcription_server.py).
+
+Sends concurrent POST /v1/audio/transcriptions requests with a clip (or a synthetic clip)
+and reports throughput, latency percentiles and how many requests were rejected with 429.
+Works against any OpenAI-compatible endpoint.
+
+Usage:
+    python src/benchmarks/server_load_test.py --url http://127.0.0.1:8000/v1 --concurrency 16 \\
+        --requests 200 [--clip recording.wav] [--api-key KEY]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_files import synthetic_speech
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_wav(seconds):
+    """Encode a synthetic speech-like clip as 16-bit mono WAV bytes."""
+    samples = (synthetic_speech(seconds, SAMPLE_RATE) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def multipart_body(audio, filename, fields):
+    """Build a multipart/form-data body; returns (content type, body)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n'.encode() + audio + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return f'multipart/form-data; boundary={boundary}', b''.join(parts)
+
+
+def send_request(url, content_type, body, api_key):
+    """Send one request and return (HTTP status, latency in seconds)."""
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+    if api_key:
+        request.add_header('Authorization', f'Bearer {api_key}')
+    start_time = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 'error'
+    return status, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test an OpenAI-compatible transcription endpoint.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/v1', help='Base URL of the API')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of requests in flight')
+    parser.add_argument('--requests', type=int, default=100, help='Total number of requests')
+    parser.add_argument('--clip', help='Audio file to send; a synthetic clip is used if not given')
+    parser.add_argument('--seconds', type=float, default=5, help='Length of the synthetic clip')
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--api-key')
+    args = parser.parse_args()
+
+    if args.clip:
+        with open(args.clip, 'rb') as file:
+            audio, filename, clip_seconds = file.read(), os.path.basename(args.clip), None
+    else:
+        audio, filename, clip_seconds = synthetic_wav(args.seconds), 'synthetic.wav', args.seconds
+    content_type, body = multipart_body(audio, filename, {'model': 'whisper-1', 'language': args.language})
+    url = args.url.rstrip('/') + '/audio/transcriptions'
+
+    print(f'Sending {args.requests} requests to {url} with {args.concurrency} in flight...')
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda _: send_request(url, content_type, body, args.api_key),
+                                    range(args.requests)))
+    elapsed = time.perf_counter() - start_time
+
+    statuses = Counter(status for status, _ in results)
+    latencies = [latency for status, latency in results if status == 200]
+    print(f'Statuses: {dict(statuses)}')
+    print(f'Elapsed: {elapsed:.2f} s, throughput: {len(latencies) / elapsed:.2f} successful requests/s')
+    if clip_seconds:
+        print(f'Audio throughput: {len(latencies) * clip_seconds / elapsed:.1f} audio seconds/s')
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f'Latency: p50 {p50:.3f} s, p95 {p95:.3f} s, p99 {p99:.3f} s, max {max(latencies):.3f} s')
+    print(f'Rejected with 429: {statuses.get(429, 0)} ({statuses.get(429, 0) / args.requests:.1%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline benchmark of the transcription pipeline.
+
+Runs transcription.transcribe over a directory of audio clips (or synthetic clips when none
+are given) for every combination of model, compute type, vad_filter and
+condition_on_previous_text. Each combination runs in a fresh process so that peak memory is
+measured in isolation. Reports the real-time factor, p50/p95/p99 latency per clip, peak RSS
+and, when a clip has a reference transcript next to it (clip.wav + clip.txt), the word error
+rate.
+
+Usage:
+    python src/benchmarks/transcription_benchmark.py --clips recordings/ --models tiny.en small.en \\
+        --compute-types int8 float32 --vad-filter both --condition-on-previous-text false \\
+        --json benchmark.json
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_files import AUDIO_EXTENSIONS, load_audio, synthetic_speech
+from utils import ConfigManager
+
+SAMPLE_RATE = 16000
+
+
+def find_clips(clips_dir):
+    """Return (path, reference transcript or None) for every audio file in the directory."""
+    clips = []
+    for name in sorted(os.listdir(clips_dir)):
+        path = os.path.join(clips_dir, name)
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        reference_path = os.path.splitext(path)[0] + '.txt'
+        reference = None
+        if os.path.isfile(reference_path):
+            with open(reference_path, 'r', encoding='utf-8') as file:
+                reference = file.read()
+        clips.append((path, reference))
+    return clips
+
+
+def normalize_words(text):
+    """Lowercase the text and split it into words without punctuation."""
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Return the word-level edit distance between the texts divided by the reference length."""
+    reference_words = normalize_words(reference)
+    hypothesis_words = normalize_words(hypothesis)
+    if not reference_words:
+        return 0.0 if not hypothesis_words else 1.0
+
+    previous = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, 1):
+        current = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (reference_word != hypothesis_word)))
+        previous = current
+    return previous[-1] / len(reference_words)
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MiB, or None if it cannot be measured."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def run_combination(combination, clips, synthetic, repeats):
+    """
+    Benchmark one combination of settings. Runs in a worker process.
+
+    :return: Dictionary with the settings and the measured metrics
+    """
+    from transcription import create_local_model, transcribe
+
+    ConfigManager.initialize()
+    ConfigManager.set_config_value(False, 'model_options', 'use_api')
+    for key, value in combination.items():
+        ConfigManager.set_config_value(value, 'model_options', 'local', key)
+
+    load_start = time.perf_counter()
+    model = create_local_model()
+    load_time = time.perf_counter() - load_start
+
+    if synthetic:
+        audios = [(f'synthetic-{index}', synthetic_speech(seconds, SAMPLE_RATE, seed=index), None)
+                  for index, seconds in enumerate(synthetic)]
+    else:
+        audios = [(path, load_audio(path, SAMPLE_RATE), reference) for path, reference in clips]
+
+    transcribe(audios[0][1], model)  # Warm-up
+
+    latencies = []
+    audio_seconds = 0.0
+    processing_seconds = 0.0
+    error_rates = []
+    for name, audio, reference in audios:
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            result = transcribe(audio, model)
+            elapsed = time.perf_counter() - start_time
+            latencies.append(elapsed)
+            processing_seconds += elapsed
+            audio_seconds += len(audio) / SAMPLE_RATE
+        if reference is not None:
+            error_rates.append(word_error_rate(reference, result))
+
+    return {
+        **combination,
+        'clips': len(audios),
+        'audio_seconds': round(audio_seconds / repeats, 3),
+        'load_seconds': round(load_time, 3),
+        'real_time_factor': round(processing_seconds / audio_seconds, 4),
+        'latency_p50': round(float(np.percentile(latencies, 50)), 4),
+        'latency_p95': round(float(np.percentile(latencies, 95)), 4),
+        'latency_p99': round(float(np.percentile(latencies, 99)), 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'wer': round(float(np.mean(error_rates)), 4) if error_rates else None,
+    }
+
+
+def parse_bool_choice(value):
+    """Turn 'true', 'false' or 'both' into the list of values to benchmark."""
+    return {'true': [True], 'false': [False], 'both': [False, True]}[value]
+
+
+def print_table(results):
+    """Print the results as a fixed-width table."""
+    print(f'{"model":<12} {"compute":<13} {"vad":<5} {"cond":<5} {"RTF":>7} {"p50 s":>8} {"p95 s":>8} '
+          f'{"p99 s":>8} {"RSS MiB":>9} {"WER":>7}')
+    for result in results:
+        if 'error' in result:
+            print(f'{result["model"]:<12} {result["compute_type"]:<13} {str(result["vad_filter"]):<5} '
+                  f'{str(result["condition_on_previous_text"]):<5} failed: {result["error"]}')
+            continue
+        rss = f'{result["peak_rss_mb"]:.0f}' if result['peak_rss_mb'] is not None else '-'
+        wer = f'{result["wer"]:.1%}' if result['wer'] is not None else '-'
+        print(f'{result["model"]:<12} {result["compute_type"]:<13} {str(result["vad_filter"]):<5} '
+              f'{str(result["condition_on_previous_text"]):<5} {result["real_time_factor"]:>7.3f} '
+              f'{result["latency_p50"]:>8.3f} {result["latency_p95"]:>8.3f} {result["latency_p99"]:>8.3f} '
+              f'{rss:>9} {wer:>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transcription speed, latency, memory and accuracy.')
+    parser.add_argument('--clips', help='Directory of audio clips, with optional .txt reference transcripts')
+    parser.add_argument('--synthetic-seconds', type=float, nargs='+', default=[3, 10, 30],
+                        help='Lengths of the synthetic clips used when --clips is not given')
+    parser.add_argument('--models', nargs='+', default=['tiny.en', 'base.en', 'small.en'])
+    parser.add_argument('--compute-types', nargs='+', default=['int8', 'float32'])
+    parser.add_argument('--device', default='auto', choices=['auto', 'cuda', 'cpu'])
+    parser.add_argument('--vad-filter', default='false', choices=['true', 'false', 'both'])
+    parser.add_argument('--condition-on-previous-text', default='both', choices=['true', 'false', 'both'])
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per clip')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    clips = find_clips(args.clips) if args.clips else []
+    synthetic = None if clips else args.synthetic_seconds
+    if args.clips and not clips:
+        print(f'No audio clips found in {args.clips}. Using synthetic clips.')
+        synthetic = args.synthetic_seconds
+
+    combinations = [
+        {'model': model, 'compute_type': compute_type, 'device': args.device, 'model_path': None,
+         'vad_filter': vad_filter, 'condition_on_previous_text': condition}
+        for model, compute_type, vad_filter, condition in itertools.product(
+            args.models, args.compute_types,
+            parse_bool_choice(args.vad_filter), parse_bool_choice(args.condition_on_previous_text))
+    ]
+
+    results = []
+    for combination in combinations:
+        print(f'Running {combination}...', file=sys.stderr)
+        # A fresh process per combination isolates the peak memory measurement
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            try:
+                results.append(executor.submit(run_combination, combination, clips, synthetic, args.repeats).result())
+            except Exception as e:
+                results.append({**combination, 'error': str(e)})
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'clips': [path for path, _ in clips] or None, 'synthetic_seconds': synthetic,
+                       'repeats': args.repeats, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of the voice activity detection engines.
+
+Runs each engine over the same synthetic recording (alternating silence, noise and voiced
+tones) in batches of 30 ms frames and reports the throughput in frames per second and the
+fraction of frames classified as speech. Engines whose dependencies are missing are skipped.
+
+Usage: python src/benchmarks/vad_benchmark.py [--seconds 60] [--batch-frames 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from vad import EnergyVAD, GatedVAD, SileroVAD, WebRTCVAD
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 480
+
+
+def synthetic_frames(seconds):
+    """Build a recording that alternates one-second blocks of silence, noise and voiced tones."""
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    blocks = []
+    for index in range(seconds):
+        kind = index % 3
+        if kind == 0:
+            block = rng.normal(0, 10, SAMPLE_RATE)
+        elif kind == 1:
+            block = rng.normal(0, 300, SAMPLE_RATE)
+        else:
+            pitch = 120 + 40 * np.sin(2 * np.pi * 0.5 * t)
+            phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+            block = sum(3000 / harmonic * np.sin(harmonic * phase) for harmonic in range(1, 6))
+        blocks.append(block)
+    audio = np.clip(np.concatenate(blocks), -32768, 32767).astype(np.int16)
+    frame_count = len(audio) // FRAME_SIZE
+    return audio[:frame_count * FRAME_SIZE].reshape(frame_count, FRAME_SIZE)
+
+
+def create_engines():
+    """Create every engine that can be loaded in this environment."""
+    engines = {'energy': lambda: EnergyVAD(threshold_db=-40, max_zero_crossing_rate=0.4)}
+    engines['webrtc'] = lambda: WebRTCVAD(2, SAMPLE_RATE)
+    engines['webrtc+gate'] = lambda: GatedVAD(EnergyVAD(threshold_db=-60), WebRTCVAD(2, SAMPLE_RATE))
+    engines['silero'] = lambda: SileroVAD(2, SAMPLE_RATE)
+    engines['silero+gate'] = lambda: GatedVAD(EnergyVAD(threshold_db=-60), SileroVAD(2, SAMPLE_RATE))
+
+    created = {}
+    for name, factory in engines.items():
+        try:
+            created[name] = factory()
+        except Exception as e:
+            print(f'Skipping {name}: {e}')
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the voice activity detection engines.')
+    parser.add_argument('--seconds', type=int, default=60, help='Length of the synthetic recording')
+    parser.add_argument('--batch-frames', type=int, default=5, help='Frames per batch, as in VADWorker')
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.seconds)
+    print(f'{len(frames)} frames of {FRAME_SIZE} samples, batches of {args.batch_frames}')
+    print(f'{"engine":<14} {"frames/s":>12} {"x realtime":>12} {"speech":>8}')
+
+    for name, engine in create_engines().items():
+        engine.reset()
+        speech_frames = 0
+        start = time.perf_counter()
+        for index in range(0, len(frames), args.batch_frames):
+            speech_frames += np.count_nonzero(engine.is_speech_batch(frames[index:index + args.batch_frames]))
+        elapsed = time.perf_counter() - start
+
+        frames_per_second = len(frames) / elapsed
+        print(f'{name:<14} {frames_per_second:>12.0f} {frames_per_second * 0.03:>12.0f} {speech_frames / len(frames):>8.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Searchable history of transcriptions, stored in a local SQLite database with an FTS5 index.
+
+Results are queued by add() and written on a background thread in batched transactions,
+so a dictation never waits on the disk. The database is opened on that thread too, and if
+it cannot be opened or written, the history is skipped rather than failing the dictation.
+Old entries are pruned to keep at most history_max_entries, and none older than
+history_retention_days.
+
+Usage: python src/history.py search "quarterly report" [--limit 20]
+       python src/history.py recent [--limit 20]
+       python src/history.py stats
+"""
+import argparse
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from utils import ConfigManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    text TEXT NOT NULL,
+    duration REAL,
+    model TEXT,
+    latency_ms REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(text, content='history', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+BATCH_SIZE = 200  # Entries per transaction at most
+BATCH_WAIT = 0.5  # Seconds to wait for more entries before committing a batch
+PRUNE_EVERY = 50  # Batches between retention checks
+
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')  # Readers do not block the writer
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def fts_query(query):
+    """Turn free text into an FTS5 query that matches entries containing every word, by prefix."""
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class TranscriptionHistory:
+    """
+    Stores transcription results and searches them.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, path, max_entries=200000, retention_days=0):
+        """
+        Initialize the TranscriptionHistory.
+
+        :param path: Path of the SQLite database
+        :param max_entries: Number of most recent entries to keep, or 0 for no limit
+        :param retention_days: Age in days after which entries are deleted, or 0 to keep them
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.retention_days = retention_days
+        self.writer = None
+        self.reader = None
+        self.failed = False
+        self.read_lock = threading.Lock()
+        self.queue = queue.Queue()
+        threading.Thread(target=self._write_entries, daemon=True).start()
+
+    @classmethod
+    def get_history(cls):
+        """Return the shared history for the configured database, or None if history is disabled."""
+        misc = ConfigManager.get_config_snapshot().misc
+        if not misc.save_history:
+            return None
+        with cls._lock:
+            if cls._instance is None or cls._instance.path != misc.history_file:
+                cls._instance = cls(misc.history_file, misc.history_max_entries, misc.history_retention_days)
+            cls._instance.max_entries = misc.history_max_entries
+            cls._instance.retention_days = misc.history_retention_days
+            return cls._instance
+
+    @classmethod
+    def add(cls, text, duration=None, latency_seconds=None):
+        """
+        Queue a result to be stored, if history is enabled. Returns immediately.
+
+        :param text: Post-processed result
+        :param duration: Length of the audio in seconds
+        :param latency_seconds: Time the transcription took
+        """
+        if not text or not text.strip():
+            return
+        try:
+            history = cls.get_history()
+            if history is None or history.failed:
+                return
+            model_options = ConfigManager.get_config_snapshot().model_options
+            model = f'api:{model_options.api.model}' if model_options.use_api else model_options.local.model
+            history.queue.put((time.time(), text.strip(), duration,
+                               model, None if latency_seconds is None else round(latency_seconds * 1000, 1)))
+        except Exception as e:
+            ConfigManager.console_print(f'Could not add the result to the transcription history: {e}')
+
+    def _write_entries(self):
+        """Write queued entries in batches, one transaction per batch, on a background thread."""
+        try:
+            self.writer = connect(self.path)
+        except (sqlite3.Error, OSError) as e:
+            ConfigManager.console_print(f'Transcription history disabled: could not open {self.path}: {e}')
+            self.failed = True
+
+        batches = 0
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                if not self.failed:
+                    with self.writer:
+                        self.writer.executemany('INSERT INTO history (timestamp, text, duration, model, latency_ms) '
+                                                'VALUES (?, ?, ?, ?, ?)', batch)
+                    batches += 1
+                    if batches % PRUNE_EVERY == 1:
+                        self.prune()
+            except sqlite3.Error as e:
+                ConfigManager.console_print(f'Error writing transcription history: {e}')
+            for _ in batch:
+                self.queue.task_done()
+
+    def prune(self):
+        """Delete the entries beyond max_entries and those older than retention_days."""
+        with self.writer:
+            if self.max_entries:
+                self.writer.execute('DELETE FROM history WHERE id <= (SELECT MAX(id) FROM history) - ?',
+                                    (self.max_entries,))
+            if self.retention_days:
+                self.writer.execute('DELETE FROM history WHERE timestamp < ?',
+                                    (time.time() - self.retention_days * 86400,))
+
+    def flush(self, timeout=5.0):
+        """Wait until the queued entries have been written, for the CLI and benchmarks."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def search(self, query, limit=50):
+        """
+        Find the most recent entries that contain every word of the query (as word prefixes).
+
+        :return: List of (id, timestamp, text, duration, model, latency_ms), newest first
+        """
+        match = fts_query(query)
+        if not match:
+            return self.recent(limit)
+        with self.read_lock:
+            return self._reader().execute(
+                'SELECT history.id, history.timestamp, history.text, history.duration, history.model, history.latency_ms '
+                'FROM history_fts '
+                'JOIN history ON history.id = history_fts.rowid '
+                'WHERE history_fts MATCH ? ORDER BY history_fts.rowid DESC LIMIT ?', (match, limit)).fetchall()
+
+    def _reader(self):
+        """Return the connection for searches, opened on first use. Call with read_lock held."""
+        if self.reader is None:
+            self.reader = connect(self.path)
+        return self.reader
+
+    def recent(self, limit=50):
+        with self.read_lock:
+            return self._reader().execute('SELECT id, timestamp, text, duration, model, latency_ms FROM history '
+                                       'ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+
+    def count(self):
+        with self.read_lock:
+            return self._reader().execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+
+def format_entry(entry):
+    _, timestamp, text, duration, model, latency_ms = entry
+    details = ', '.join(part for part in (f'{duration:.1f} s' if duration else None, model,
+                                           f'{latency_ms:.0f} ms' if latency_ms else None) if part)
+    return f'{time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))}  {text}  ({details})'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search the transcription history.')
+    parser.add_argument('command', choices=['search', 'recent', 'stats'])
+    parser.add_argument('query', nargs='*', help='Words to search for')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum number of results')
+    parser.add_argument('--history-file', help='Database to search (default: history_file from the config)')
+    args = parser.parse_args()
+
+    ConfigManager.initialize()
+    path = args.history_file or ConfigManager.get_config_value('misc', 'history_file')
+    if not os.path.isfile(path):
+        sys.exit(f'No transcription history found at {path}.')
+    history = TranscriptionHistory(path, max_entries=0)
+
+    if args.command == 'stats':
+        print(f'{history.count()} entries in {path} ({os.path.getsize(path) / 1e6:.1f} MB)')
+        return
+
+    start = time.perf_counter()
+    results = history.search(' '.join(args.query), args.limit) if args.command == 'search' \
+        else history.recent(args.limit)
+    elapsed = time.perf_counter() - start
+    for entry in results:
+        print(format_entry(entry))
+    print(f'{len(results)} results in {elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,22 @@
-import time
+import os
+import queue
+import shutil
 import subprocess
-from PyQt5.QtCore import QTimer
-from pynput.keyboard import Controller as PynputController
+import sys
+import threading
+import time
 
 from utils import ConfigManager
 
+# Clipboard tools tried in order, with the environment variable that must be set for each
+CLIPBOARD_COMMANDS = [
+    (['wl-copy'], 'WAYLAND_DISPLAY'),
+    (['xclip', '-selection', 'clipboard'], 'DISPLAY'),
+    (['xsel', '--clipboard', '--input'], 'DISPLAY'),
+    (['pbcopy'], None),
+]
+YDOTOOL_MAX_CHUNK = 4096  # Characters per ydotool invocation, well below the argument length limit
+
 def run_command_or_exit_on_failure(command):
     """
     Run a shell command and exit if it fails.
@@ -18,9 +30,188 @@ def run_command_or_exit_on_failure(command):
         print(f"Error running command: {e}")
         exit(1)
 
+def copy_to_clipboard(text):
+    """
+    Copy text to the clipboard with the first available clipboard tool.
+
+    :return: False if no clipboard tool is available
+    """
+    for command, display_variable in CLIPBOARD_COMMANDS:
+        if shutil.which(command[0]) and (display_variable is None or os.getenv(display_variable)):
+            subprocess.run(command, input=text.encode('utf-8'), check=True, timeout=5)
+            return True
+    return False
+
+
+class InputBackend:
+    """
+    Base class for the ways of injecting text into the focused window.
+
+    type_keys() sends one keystroke per character; type_bulk() injects the whole text at
+    once, by pasting it if a clipboard tool is available and otherwise by typing it without
+    delays in as few tool invocations as possible.
+    """
+
+    def type_keys(self, text, interval):
+        """
+        Type the text one keystroke at a time.
+
+        :param interval: Seconds to wait between keystrokes
+        """
+        raise NotImplementedError
+
+    def paste(self):
+        """Send the paste shortcut to the focused window."""
+        raise NotImplementedError
+
+    def type_batched(self, text):
+        """Type the text as fast as the backend allows."""
+        self.type_keys(text, 0)
+
+    def type_bulk(self, text):
+        if copy_to_clipboard(text):
+            self.paste()
+        else:
+            self.type_batched(text)
+
+    def close(self):
+        pass
+
+
+class PynputBackend(InputBackend):
+    """Types with pynput, which works on Windows, macOS and X11."""
+
+    def __init__(self):
+        from pynput.keyboard import Controller, Key
+
+        self.keyboard = Controller()
+        self.paste_modifier = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+
+    def type_keys(self, text, interval):
+        for char in text:
+            self.keyboard.type(char)
+            if interval:
+                time.sleep(interval)
+
+    def type_batched(self, text):
+        self.keyboard.type(text)
+
+    def paste(self):
+        with self.keyboard.pressed(self.paste_modifier):
+            self.keyboard.press('v')
+            self.keyboard.release('v')
+
+
+class YdotoolBackend(InputBackend):
+    """Types through the ydotool daemon, which also works on Wayland. Each call runs the ydotool client."""
+
+    def type_keys(self, text, interval):
+        subprocess.run(['ydotool', 'type', '--key-delay', str(int(interval * 1000)), '--', text], check=True)
+
+    def type_batched(self, text):
+        for start in range(0, len(text), YDOTOOL_MAX_CHUNK):
+            subprocess.run(['ydotool', 'type', '--key-delay', '0', '--key-hold', '0', '--',
+                            text[start:start + YDOTOOL_MAX_CHUNK]], check=True)
+
+    def paste(self):
+        subprocess.run(['ydotool', 'key', '29:1', '47:1', '47:0', '29:0'], check=True)  # Left Ctrl + V
+
+
+class DotoolBackend(InputBackend):
+    """Types through a long-running dotool process that reads commands from a pipe."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(['dotool'], stdin=subprocess.PIPE, text=True, encoding='utf-8')
+
+    def send(self, commands):
+        self.process.stdin.write(''.join(f'{command}\n' for command in commands))
+        self.process.stdin.flush()
+
+    def type_commands(self, text):
+        # dotool reads one command per line, so line breaks are sent as the enter key
+        commands = []
+        for index, line in enumerate(text.split('\n')):
+            if index:
+                commands.append('key enter')
+            if line:
+                commands.append(f'type {line}')
+        return commands
+
+    def type_keys(self, text, interval):
+        self.send([f'typedelay {int(interval * 1000)}'] + self.type_commands(text))
+
+    def type_batched(self, text):
+        self.send(['typedelay 0', 'typehold 0'] + self.type_commands(text))
+
+    def paste(self):
+        self.send(['key ctrl+v'])
+
+    def close(self):
+        if self.process:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+
+class ClipboardBackend(PynputBackend):
+    """Always pastes the text through the clipboard, even when it is short."""
+
+    def type_keys(self, text, interval):
+        self.type_bulk(text)
+
+
+class FakeBackend(InputBackend):
+    """
+    Collects the injected text instead of sending it anywhere, for tests and benchmarks.
+
+    :param keystroke_cost: Seconds each simulated keystroke takes on top of the interval
+    :param paste_cost: Seconds a simulated paste takes
+    """
+
+    def __init__(self, keystroke_cost=0.0, paste_cost=0.0):
+        self.keystroke_cost = keystroke_cost
+        self.paste_cost = paste_cost
+        self.chunks = []
+
+    @property
+    def text(self):
+        return ''.join(self.chunks)
+
+    def type_keys(self, text, interval):
+        delay = interval + self.keystroke_cost
+        for char in text:
+            self.chunks.append(char)
+            if delay:
+                time.sleep(delay)
+
+    def type_bulk(self, text):
+        if self.paste_cost:
+            time.sleep(self.paste_cost)
+        self.chunks.append(text)
+
+
+def create_input_backend(input_method):
+    """
+    Create the backend for an input method.
+    """
+    if input_method == 'ydotool':
+        return YdotoolBackend()
+    if input_method == 'dotool':
+        return DotoolBackend()
+    if input_method == 'clipboard':
+        return ClipboardBackend()
+    if input_method == 'fake':
+        return FakeBackend()
+    return PynputBackend()
+
+
 class InputSimulator:
     """
     A class to simulate keyboard input using various methods.
+
+    Unless type_into_window is enabled, results are shown in the overlay to be pasted by hand.
+    Otherwise they are injected into the focused window on a worker thread: text up to
+    bulk_input_threshold characters is typed key by key, longer text is injected in bulk.
     """
 
     def __init__(self, transparent_window):
@@ -29,17 +220,66 @@ class InputSimulator:
         """
         self.transparent_window = transparent_window
         self.input_method = ConfigManager.get_config_value('post_processing', 'input_method')
+        self.backend = None
+        self.backend_method = None
+        self.jobs = queue.Queue()
+        self.worker = None
 
-    def typewrite(self, text):
+    def typewrite(self, text, on_finished=None):
         """
         Simulate typing the given text with the specified interval between keystrokes.
 
         Args:
             text (str): The text to type.
+            on_finished (callable): Called on the worker thread once the text has been injected.
+        """
+        post_processing = ConfigManager.get_config_snapshot().post_processing
+        self.input_method = post_processing.input_method
+        if not post_processing.type_into_window:
+            self.transparent_window.display_text(text)
+            return
+
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, daemon=True)
+            self.worker.start()
+        self.jobs.put((text, on_finished))
+
+    def inject(self, text):
         """
-        self.transparent_window.display_text(text)
+        Inject the text into the focused window with the configured input method, on the calling thread.
+        """
+        post_processing = ConfigManager.get_config_snapshot().post_processing
+        if self.backend_method != post_processing.input_method:
+            if self.backend:
+                self.backend.close()
+            self.backend = create_input_backend(post_processing.input_method)
+            self.backend_method = post_processing.input_method
+
+        if len(text) <= post_processing.bulk_input_threshold:
+            self.backend.type_keys(text, post_processing.writing_key_press_delay)
+        else:
+            self.backend.type_bulk(text)
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            text, on_finished = job
+            try:
+                self.inject(text)
+            except Exception as e:
+                ConfigManager.console_print(f'Could not type the result with {self.input_method}: {e}')
+            if on_finished:
+                on_finished()
 
     def stop(self):
         """Stop the input simulator."""
-        # Add any necessary cleanup code here
-        pass
+        if self.worker:
+            self.jobs.put(None)
+            self.worker.join(timeout=5)
+            self.worker = None
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+            self.backend_method = None
@@ -1,4 +1,3 @@
-from pynput import keyboard
 import time
 
 class KeyListener:
@@ -12,11 +11,15 @@ class KeyListener:
             "on_paste": []
         }
         self.last_activation_time = 0
+        self.last_hotkey_ns = None  # perf_counter_ns() of the latest hotkey press, for latency tracing
         self.activation_delay = 1  # Minimum delay in seconds between activations
 
     def start(self):
-        """Start the key listener."""
+        """Start the key listener, replacing the running one if there is one."""
+        self.stop()
         try:
+            from pynput import keyboard
+
             self.listener = keyboard.GlobalHotKeys({
                 '<ctrl>+<shift>+<alt>': self._on_hotkey_triggered,
                 '<ctrl>+v': self._on_paste_triggered,
@@ -34,6 +37,7 @@ class KeyListener:
 
     def _on_hotkey_triggered(self):
         """Callback for the key combination."""
+        self.last_hotkey_ns = time.perf_counter_ns()
         current_time = time.time()
         if current_time - self.last_activation_time >= self.activation_delay:
             self.last_activation_time = current_time
@@ -57,6 +61,6 @@ if __name__ == "__main__":
     key_listener.start()
     try:
         while True:
-            pass
+            time.sleep(3600)  # Sleep instead of spinning; the listener runs on its own thread
     except KeyboardInterrupt:
         key_listener.stop()
@@ -1,50 +1,120 @@
 import os
 import sys
-from audioplayer import AudioPlayer # type: ignore
-from PyQt5.QtCore import QObject, QProcess, pyqtSlot, pyqtSignal, QMetaObject, Qt, Q_ARG # type: ignore
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot, pyqtSignal, QMetaObject, Qt, Q_ARG # type: ignore
 from PyQt5.QtGui import QIcon                      # type: ignore
-from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox  # type: ignore
+from PyQt5.QtWidgets import QApplication, QMessageBox  # type: ignore
 
 from key_listener import KeyListener
 from result_thread import ResultThread
-from ui.settings_window import SettingsWindow
-from ui.status_window import StatusWindow
 from ui.system_tray_icon import SystemTrayIcon
 from ui.transparent_window import TransparentWindow
-from transcription import create_local_model
+from model_manager import ModelManager
+from startup_profile import StartupProfiler
+from tracing import Tracer
 from input_simulation import InputSimulator
 from utils import ConfigManager
 
+# The settings and status windows are imported and built the first time they are shown
+
 class WhisperWriterApp(QObject):
     statusSignal = pyqtSignal(str)
     resultSignal = pyqtSignal(str)
+    modelLoadedSignal = pyqtSignal()
+    configFileChangedSignal = pyqtSignal()
 
     def __init__(self):
         """
         Initialize the application, opening settings window if no configuration file is found.
         """
         super().__init__()
-        self.app = QApplication(sys.argv)
-        self.app.setWindowIcon(QIcon(os.path.join('assets', 'ww-logo.png')))
-
-        ConfigManager.initialize()
-
-        self.settings_window = SettingsWindow()
-        self.settings_window.settings_closed.connect(self.on_settings_closed)
-        self.settings_window.settings_saved.connect(self.restart_app)
-
-        self.transparent_window = TransparentWindow()
+        self.start_time = time.perf_counter()
+        self.first_result_time = None
+        with StartupProfiler.phase('QApplication'):
+            self.app = QApplication(sys.argv)
+            self.app.setWindowIcon(QIcon(os.path.join('assets', 'ww-logo.png')))
+
+        with StartupProfiler.phase('config'):
+            ConfigManager.initialize()
+        if ConfigManager.get_config_value('misc', 'trace_latency'):
+            Tracer.initialize(trace_file=ConfigManager.get_config_value('misc', 'trace_file') or 'traces.jsonl',
+                              metrics_port=ConfigManager.get_config_value('misc', 'metrics_port'))
+
+        self.settings_window = None
+        self.status_window = None
+        self.history_window = None
+
+        # Apply changes made to the config file outside the settings window, too
+        self.configFileChangedSignal.connect(self.apply_settings)
+        ConfigManager.subscribe(lambda old_snapshot, new_snapshot: self.configFileChangedSignal.emit())
+        ConfigManager.watch_config_file()
+
+        with StartupProfiler.phase('overlay window'):
+            self.transparent_window = TransparentWindow()
+        self.transparent_window.typingFinished.connect(self.on_typing_finished)
+        self.overlay_trace = None # The trace of the result being typed out in the overlay.
 
         self.type_result = False # Type the result out when it is received.
         self.use_clipboard = False # Copy the result to the clipboard when it is received.
 
+        self.model_manager = ModelManager()
+        self.modelLoadedSignal.connect(self.on_model_loaded)
+        self.statusSignal.connect(self.handle_status_signal)  # Queued when emitted from the key listener thread
+        self.applied_config = None # The configuration the running components were built with.
+        self.components_initialized = False
+        self.startup_report_pending = StartupProfiler.is_enabled()
+
         if ConfigManager.config_file_exists():
             self.initialize_components()
         else:
             print('No valid configuration file found. Opening settings window...')
-            self.settings_window.show()
+            self.show_settings()
 
         self.hide_terminal()
+        QTimer.singleShot(0, self.on_event_loop_started)
+
+    def show_settings(self):
+        """
+        Show the settings window, building it the first time.
+        """
+        if self.settings_window is None:
+            with StartupProfiler.phase('settings window'):
+                from ui.settings_window import SettingsWindow
+                self.settings_window = SettingsWindow()
+            self.settings_window.settings_closed.connect(self.on_settings_closed)
+            self.settings_window.settings_saved.connect(self.apply_settings)
+        self.settings_window.show()
+
+    def show_history(self):
+        """
+        Show the transcription history search window, building it the first time.
+        """
+        if self.history_window is None:
+            from ui.history_window import HistoryWindow
+            self.history_window = HistoryWindow()
+        self.history_window.show()
+
+    def get_status_window(self):
+        """
+        Return the status window, building it the first time.
+        """
+        if self.status_window is None:
+            with StartupProfiler.phase('status window'):
+                from ui.status_window import StatusWindow
+                self.status_window = StatusWindow()
+        return self.status_window
+
+    def on_event_loop_started(self):
+        """
+        Called once the Qt event loop is running; reports the start-up profile if requested.
+        """
+        StartupProfiler.mark('event loop running')
+        if self.startup_report_pending and not self.model_manager.is_loading():
+            self.report_startup()
+
+    def report_startup(self):
+        self.startup_report_pending = False
+        StartupProfiler.report(StartupProfiler.json_path)
 
     def initialize_components(self):
         """
@@ -56,15 +126,20 @@ class WhisperWriterApp(QObject):
         self.key_listener.add_callback("on_activate_typing_and_clipboard", lambda: self.on_activation(type_result=True, use_clipboard=True))
         self.key_listener.add_callback("on_paste", self.transparent_window.reset_window)
 
-        self.local_model = create_local_model()
+        self.applied_config = ConfigManager.get_config_copy()
 
         self.result_thread = None
+        with StartupProfiler.phase('result thread'):
+            self.start_result_thread()
 
-        if not ConfigManager.get_config_value('misc', 'hide_status_window'):
-            self.status_window = StatusWindow()
+        with StartupProfiler.phase('tray icon'):
+            self.create_tray_icon()
+        with StartupProfiler.phase('key listener'):
+            self.start_listening()
+        self.components_initialized = True
 
-        self.create_tray_icon()
-        self.start_listening()
+        # Load the model in the background so the app is usable while it loads
+        self.load_model()
 
     def create_tray_icon(self):
         """
@@ -107,11 +182,58 @@ class WhisperWriterApp(QObject):
         self.cleanup()
         QApplication.quit()
 
-    def restart_app(self):
-        """Restart the application to apply the new settings."""
-        self.cleanup()
-        QApplication.quit()
-        QProcess.startDetached(sys.executable, sys.argv)
+    def apply_settings(self):
+        """
+        Apply newly saved settings in-process, reloading only the components whose options changed.
+        """
+        if not self.components_initialized:
+            self.initialize_components()
+            return
+
+        new_config = ConfigManager.get_config_copy()
+        changed = ConfigManager.diff_config(self.applied_config, new_config)
+        self.applied_config = new_config
+        if not changed:
+            return
+
+        ConfigManager.console_print(f'Applying changed settings: {", ".join(".".join(key) for key in sorted(changed))}')
+
+        if ModelManager.model_changed(changed):
+            self.load_model()
+
+        if any(key[0] == 'recording_options' for key in changed):
+            self.result_thread.update_capture()
+
+        # The remaining options are read at the start of each recording. The key listener uses
+        # fixed hotkeys, so the activation key and input backend options do not affect it.
+
+    def load_model(self):
+        """
+        Load the local model on a background thread, showing the loading state unless a dictation is running.
+        """
+        if (ConfigManager.get_config_value('model_options', 'use_api')
+                and not ConfigManager.get_config_value('model_options', 'hedge')):
+            return
+        if not self.is_recording_or_transcribing():
+            self.handle_status_signal('loading')
+        self.model_manager.load_async(on_loaded=self.modelLoadedSignal.emit)
+
+    @pyqtSlot()
+    def on_model_loaded(self):
+        """
+        Called on the GUI thread once the local model has been loaded and warmed up.
+        """
+        if not self.is_recording_or_transcribing():
+            self.handle_status_signal('idle')
+        if self.startup_report_pending:
+            StartupProfiler.mark('model ready')
+            self.report_startup()
+
+    def is_recording_or_transcribing(self):
+        """
+        Check whether a dictation is being recorded or is waiting for transcription.
+        """
+        return bool(self.result_thread and (self.result_thread.is_busy or self.result_thread.pending))
 
     def on_settings_closed(self):
         """
@@ -127,30 +249,43 @@ class WhisperWriterApp(QObject):
 
     def on_activation(self, type_result, use_clipboard):
         """
-        Called when the activation key combination is pressed.
+        Called when the activation key combination is pressed. Stops the recording in progress,
+        or starts a new one, even while earlier recordings are still being transcribed.
         """
+        hotkey_ns = self.key_listener.last_hotkey_ns
+        trace = Tracer.start_trace(hotkey_ns)
+        if hotkey_ns:
+            Tracer.record(trace, 'key_debounce', hotkey_ns)
+
+        # The result thread decides under its lock whether this press stops or starts a recording
+        # Unless a recording starts, the trace is dropped unfinished, as it belongs to no dictation
+        outcome = self.result_thread.toggle_recording(trace)
+        if outcome == 'queue_full':
+            # max_queued_recordings reached
+            self.statusSignal.emit('queue_full')
+            return
+        if outcome == 'stopped':
+            QMetaObject.invokeMethod(self.transparent_window, "display_text", Qt.QueuedConnection, Q_ARG(str, ""))
+            return
+
         self.type_result = type_result
         self.use_clipboard = use_clipboard
 
         # Show the transparent window immediately
         QMetaObject.invokeMethod(self.transparent_window, "display_text", Qt.QueuedConnection, Q_ARG(str, ""))
 
-        if self.result_thread and self.result_thread.isRunning():
-            self.result_thread.stop_recording()
-            return
-
-        self.start_result_thread()
-
     def start_result_thread(self):
         """
-        Start the result thread to record audio and transcribe it.
+        Start the long-lived result thread that records and transcribes each dictation.
         """
         if self.result_thread and self.result_thread.isRunning():
             return
 
-        self.result_thread = ResultThread(self.local_model)
+        self.result_thread = ResultThread(self.model_manager)
         self.result_thread.statusSignal.connect(self.handle_status_signal)
         self.result_thread.resultSignal.connect(self.handle_result_signal)
+        self.result_thread.partialSignal.connect(self.handle_partial_signal)
+        self.result_thread.queueSignal.connect(self.handle_queue_signal)
         self.result_thread.start()
 
     @pyqtSlot(str)
@@ -158,32 +293,76 @@ class WhisperWriterApp(QObject):
         """
         Handle status signals from the result thread.
         """
-        if hasattr(self, 'status_window') and not ConfigManager.get_config_value('misc', 'hide_status_window'):
-            self.status_window.updateStatus(status)
+        if ConfigManager.get_config_snapshot().misc.hide_status_window:
+            return
+        # Only build the status window once there is something to show
+        if self.status_window is not None or status in ('recording', 'loading', 'queue_full'):
+            self.get_status_window().updateStatus(status)
 
-    @pyqtSlot(str)
-    def handle_result_signal(self, result):
+    @pyqtSlot(int, float)
+    def handle_queue_signal(self, depth, oldest_queued_at):
         """
-        Handle result signals from the result thread.
+        Show the number of recordings waiting for transcription in the status window.
         """
+        if self.status_window is not None and not ConfigManager.get_config_snapshot().misc.hide_status_window:
+            self.status_window.updateQueue(depth, oldest_queued_at)
+
+    @pyqtSlot(str, object)
+    def handle_result_signal(self, result, trace):
+        """
+        Handle result signals from the result thread, which arrive in the order the recordings were made.
+        """
+        if trace:
+            trace.since('signal_hop', 'signal_hop')
+            if result:
+                trace.mark('typewriter')
+                self.overlay_trace = trace
+            else:
+                Tracer.finish_trace(trace)
         self.on_transcription_complete(result)
 
+    @pyqtSlot()
+    def on_typing_finished(self):
+        """
+        Finish the latency trace once the overlay has typed out the result.
+        """
+        if self.overlay_trace:
+            self.overlay_trace.since('typewriter', 'typewriter')
+            Tracer.finish_trace(self.overlay_trace)
+            self.overlay_trace = None
+
+    @pyqtSlot(str)
+    def handle_partial_signal(self, partial):
+        """
+        Handle partial transcription signals from the result thread while still recording.
+        """
+        QMetaObject.invokeMethod(self.transparent_window, "display_partial", Qt.QueuedConnection, Q_ARG(str, partial))
+
     @pyqtSlot(str)
     def on_transcription_complete(self, result):
         """
-        When the transcription is complete, display the result in the transparent window.
+        When the transcription is complete, display the result in the transparent window,
+        or type it into the focused window with the configured input method if type_into_window is enabled.
         """
-        QMetaObject.invokeMethod(self.transparent_window, "display_text", Qt.QueuedConnection, Q_ARG(str, result))
+        if self.type_result and result and ConfigManager.get_config_snapshot().post_processing.type_into_window:
+            self.transparent_window.reset_window()
+            self.input_simulator.typewrite(
+                result, on_finished=lambda: QMetaObject.invokeMethod(self, "on_typing_finished", Qt.QueuedConnection))
+        else:
+            QMetaObject.invokeMethod(self.transparent_window, "display_text", Qt.QueuedConnection, Q_ARG(str, result))
+
+        if self.first_result_time is None:
+            self.first_result_time = time.perf_counter() - self.start_time
+            ConfigManager.console_print(f'Time to first result: {self.first_result_time:.2f} seconds since launch.')
 
         # Always copy the result to the clipboard
         clipboard = QApplication.clipboard()
         clipboard.setText(result)
 
-        if ConfigManager.get_config_value('misc', 'noise_on_completion'):
+        if ConfigManager.get_config_snapshot().misc.noise_on_completion:
+            from audioplayer import AudioPlayer # type: ignore
             AudioPlayer(os.path.join('assets', 'soft-beep.wav')).play(block=True)
 
-        self.key_listener.start()
-
     def run(self):
         """
         Start the application.
@@ -191,6 +370,26 @@ class WhisperWriterApp(QObject):
         sys.exit(self.app.exec_())
 
 
-if __name__ == '__main__':
+def main(argv):
+    """
+    Run WhisperWriter, or the autotuner with --autotune.
+
+    With --profile-startup, a timeline of the imports and initialization phases is printed
+    once the app is ready; --profile-startup-json PATH also writes it to a file.
+    """
+    if '--autotune' in argv:
+        import autotune
+        autotune.main(argv)
+        sys.exit(0)
+
+    if '--profile-startup' in argv or '--profile-startup-json' in argv:
+        StartupProfiler.enable()
+        if '--profile-startup-json' in argv and argv.index('--profile-startup-json') + 1 < len(argv):
+            StartupProfiler.json_path = argv[argv.index('--profile-startup-json') + 1]
+
     app = WhisperWriterApp()
     app.run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,349 @@
+"""
+Out-of-process host for the local Whisper model.
+
+The daemon loads the model once and serves transcription requests from any number of local
+clients over a Unix socket. Audio is not sent through the socket: each client writes it into
+a shared-memory segment it owns and only sends the segment name and length, so the socket
+carries small JSON control messages. The daemon outlives the GUI, so restarting the GUI
+does not reload the model.
+
+Usage: python src/model_daemon.py [--socket PATH] [--stop | --status]
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils import ConfigManager
+
+# Seconds to wait for a newly started daemon to accept connections
+STARTUP_TIMEOUT = 30
+
+
+def default_socket_path():
+    """Return the per-user socket path used when daemon_socket is not configured."""
+    user = os.getuid() if hasattr(os, 'getuid') else os.getlogin()
+    return os.path.join(tempfile.gettempdir(), f'whisper-writer-{user}.sock')
+
+
+def is_supported():
+    """Check whether this platform supports Unix domain sockets."""
+    return hasattr(socket, 'AF_UNIX')
+
+
+def send_message(file, message):
+    file.write(json.dumps(message).encode('utf-8') + b'\n')
+    file.flush()
+
+
+def receive_message(file):
+    line = file.readline()
+    if not line:
+        raise ConnectionError('The model daemon closed the connection.')
+    return json.loads(line)
+
+
+def attach_shared_memory(name):
+    """
+    Attach to a client's shared-memory segment without taking ownership of it.
+
+    Before Python 3.13 attaching registers the segment with this process's resource tracker,
+    which would unlink it when the daemon exits; the client is the owner, so undo that.
+    """
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+    return segment
+
+
+class ModelDaemon:
+    """
+    Serve the local model to clients connected to a Unix socket.
+
+    Each connection uses the model it last loaded; models are shared between connections
+    with the same options through the ModelManager cache.
+
+    Requests are newline-delimited JSON objects with an 'op' key:
+        ping        -> {'ok': True, 'pid': ..., 'clients': ..., 'models': [cached model keys]}
+        load        {'model_options': {...}} -> {'ok': True, 'load_seconds': ...}
+        transcribe  {'shm': name, 'samples': n, 'options': {...}} -> {'segments': [...]}
+        shutdown    -> {'ok': True}
+    Errors are returned as {'error': message}.
+    """
+
+    def __init__(self, socket_path):
+        from model_manager import ModelManager
+
+        self.socket_path = socket_path
+        self.model_manager = ModelManager()
+        self.load_lock = threading.Lock()
+        self.clients = 0
+        self.clients_lock = threading.Lock()  # The client count is updated by every handler thread
+        self.server = None
+
+    def serve_forever(self):
+        """Listen on the socket until a shutdown request is received."""
+        if os.path.exists(self.socket_path):
+            if DaemonModel.ping(self.socket_path):
+                print(f'A model daemon is already listening on {self.socket_path}.')
+                return
+            os.unlink(self.socket_path)  # Left behind by a daemon that did not exit cleanly
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(handler):
+                daemon.handle_client(handler.rfile, handler.wfile)
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        print(f'Model daemon listening on {self.socket_path} (pid {os.getpid()}).')
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def handle_client(self, rfile, wfile):
+        """Answer the requests of one client until it disconnects."""
+        with self.clients_lock:
+            self.clients += 1
+        segment = None
+        model = None
+        try:
+            while True:
+                line = rfile.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                    op = request.get('op')
+                    if op == 'transcribe':
+                        if segment is None or segment.name != request['shm']:
+                            if segment is not None:
+                                segment.close()
+                            segment = attach_shared_memory(request['shm'])
+                        response = self.transcribe(model, segment, request['samples'], request.get('options', {}))
+                    elif op == 'load':
+                        model, response = self.load(request['model_options'])
+                    elif op == 'ping':
+                        response = {'ok': True, 'pid': os.getpid(), 'clients': self.clients,
+                                    'models': [list(key) for key in self.model_manager.cache]}
+                    elif op == 'shutdown':
+                        send_message(wfile, {'ok': True})
+                        threading.Thread(target=self.server.shutdown, daemon=True).start()
+                        return
+                    else:
+                        response = {'error': f'Unknown operation: {op}'}
+                except Exception as e:
+                    response = {'error': f'{type(e).__name__}: {e}'}
+                send_message(wfile, response)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.clients_lock:
+                self.clients -= 1
+            if segment is not None:
+                segment.close()
+
+    def load(self, model_options):
+        """
+        Return the model for the given local model options, loading it if it is not cached.
+
+        :return: Tuple of (model, response)
+        """
+        from model_manager import MODEL_OPTION_KEYS
+
+        with self.load_lock:
+            ConfigManager.set_config_values(
+                [(('model_options', 'local', key), model_options[key]) for key in MODEL_OPTION_KEYS if key in model_options]
+                + [(('model_options', 'local', 'use_daemon'), False)])
+            start_time = time.perf_counter()
+            model = self.model_manager.get_model()
+            return model, {'ok': True, 'load_seconds': round(time.perf_counter() - start_time, 3)}
+
+    def transcribe(self, model, segment, samples, options):
+        """Transcribe audio from a client's shared-memory segment and return the materialized segments."""
+        if model is None:
+            return {'error': 'No model loaded. Send a load request first.'}
+
+        # The client does not touch the segment until it has received the response
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=segment.buf)
+        segments, _ = model.transcribe(audio=audio, **options)
+        return {'segments': [
+            {'text': s.text, 'words': [[w.word, w.end] for w in s.words] if s.words else None}
+            for s in segments
+        ]}
+
+
+class DaemonModel:
+    """
+    Client-side stand-in for a WhisperModel that is hosted by the model daemon.
+
+    transcribe() has the same calling convention as WhisperModel.transcribe(), so the
+    transcription functions can use it unchanged. The daemon is started on first use if it
+    is not running, and the connection is re-established if the daemon is restarted.
+    """
+
+    def __init__(self, socket_path=None, model_options=None):
+        """
+        Connect to the daemon, starting it if needed, and have it load the model.
+
+        :param socket_path: Path of the daemon's socket; defaults to a per-user path
+        :param model_options: Local model options to load; defaults to the current configuration
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.model_options = model_options or dict(ConfigManager.get_config_section('model_options', 'local'))
+        self.lock = threading.Lock()
+        self.sock = None
+        self.file = None
+        self.segment = None
+        with self.lock:
+            self._connect()
+
+    @staticmethod
+    def ping(socket_path):
+        """Return the daemon's status, or None if no daemon is listening on the socket."""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(2)
+                sock.connect(socket_path)
+                file = sock.makefile('rwb')
+                send_message(file, {'op': 'ping'})
+                return receive_message(file)
+        except (OSError, ValueError, ConnectionError):
+            return None
+
+    @staticmethod
+    def start_daemon(socket_path):
+        """Start a detached daemon process that keeps running after this process exits."""
+        ConfigManager.console_print('Starting model daemon...')
+        script = os.path.abspath(__file__)
+        subprocess.Popen([sys.executable, script, '--socket', socket_path],
+                         stdin=subprocess.DEVNULL, start_new_session=True)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if DaemonModel.ping(socket_path):
+                return
+            time.sleep(0.1)
+        raise TimeoutError(f'The model daemon did not start listening on {socket_path}.')
+
+    def _connect(self):
+        """Connect to the daemon and load the model, starting the daemon if it is not running."""
+        if not DaemonModel.ping(self.socket_path):
+            DaemonModel.start_daemon(self.socket_path)
+        self.close()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+        self.file = self.sock.makefile('rwb')
+        response = self._request({'op': 'load', 'model_options': self.model_options})
+        ConfigManager.console_print(f'Model daemon loaded the model in {response["load_seconds"]:.2f} seconds.')
+
+    def _request(self, message):
+        send_message(self.file, message)
+        response = receive_message(self.file)
+        if 'error' in response:
+            raise RuntimeError(f'Model daemon error: {response["error"]}')
+        return response
+
+    def _write_audio(self, audio):
+        """Copy the audio into this client's shared-memory segment, growing it if needed."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        if self.segment is None or self.segment.size < audio.nbytes:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment.unlink()
+            # Grow geometrically so a growing streaming recording does not reallocate on every pass
+            size = max(audio.nbytes, 2 * self.segment.size if self.segment else 16000 * 4 * 30)
+            self.segment = shared_memory.SharedMemory(create=True, size=size)
+        np.ndarray(audio.shape, dtype=np.float32, buffer=self.segment.buf)[:] = audio
+        return audio.size
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe float32 audio in the daemon.
+
+        :return: Tuple of (list of segments with .text and .words, None)
+        """
+        with self.lock:
+            samples = self._write_audio(audio)
+            message = {'op': 'transcribe', 'shm': self.segment.name, 'samples': samples, 'options': options}
+            try:
+                response = self._request(message)
+            except (ConnectionError, OSError):
+                ConfigManager.console_print('Lost connection to the model daemon. Reconnecting...')
+                self._connect()
+                response = self._request(message)
+
+        return [
+            SimpleNamespace(text=segment['text'],
+                            words=[SimpleNamespace(word=word, end=end) for word, end in segment['words'] or []])
+            for segment in response['segments']
+        ], None
+
+    def close(self):
+        """Close the connection. The daemon keeps running."""
+        if self.sock is not None:
+            self.file.close()
+            self.sock.close()
+            self.sock = None
+
+    def __del__(self):
+        try:
+            self.close()
+            if self.segment is not None:
+                self.segment.close()
+                self.segment.unlink()
+        except Exception:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host the local Whisper model for WhisperWriter clients.')
+    parser.add_argument('--socket', help='Path of the Unix socket (default: daemon_socket from the config)')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    parser.add_argument('--status', action='store_true', help='Show the status of the running daemon')
+    args = parser.parse_args()
+
+    if not is_supported():
+        print('The model daemon requires Unix domain sockets, which this platform does not support.')
+        sys.exit(1)
+
+    ConfigManager.initialize()
+    socket_path = (args.socket or ConfigManager.get_config_value('model_options', 'local', 'daemon_socket')
+                   or default_socket_path())
+
+    if args.status or args.stop:
+        status = DaemonModel.ping(socket_path)
+        if status is None:
+            print(f'No model daemon is listening on {socket_path}.')
+            return
+        print(status)
+        if args.stop:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+                file = sock.makefile('rwb')
+                send_message(file, {'op': 'shutdown'})
+                receive_message(file)
+            print('Model daemon stopped.')
+        return
+
+    ModelDaemon(socket_path).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import time
+import traceback
+import numpy as np
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+
+from transcription import create_local_model
+from utils import ConfigManager
+
+# Local model options that require a different WhisperModel instance when changed
+MODEL_OPTION_KEYS = ('model', 'device', 'compute_type', 'model_path', 'use_daemon', 'daemon_socket')
+
+
+class ModelManager:
+    """
+    Own the local Whisper model and keep a small LRU cache of recently used instances.
+
+    Models are keyed by the options in MODEL_OPTION_KEYS, so switching back to a
+    recently used configuration reuses the loaded model instead of reading it from disk.
+    Models are loaded and warmed up on a background thread with load_async(); callers that
+    need the model block in wait_for_model() until it is ready.
+    """
+
+    def __init__(self, cache_size=2):
+        """
+        Initialize the ModelManager.
+
+        :param cache_size: Maximum number of models to keep loaded
+        """
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.model = None
+        self.ready = Event()
+        self.lock = Lock()
+        self.load_time = None
+        self.load_generation = 0
+
+    @staticmethod
+    def model_key(local_model_options=None):
+        """Return the cache key for the given (or the current) local model options."""
+        if local_model_options is None:
+            local_model_options = ConfigManager.get_config_section('model_options', 'local')
+        return tuple(local_model_options.get(key) for key in MODEL_OPTION_KEYS)
+
+    @staticmethod
+    def model_changed(changed_keys):
+        """Check whether a set of changed config keys (see ConfigManager.diff_config) affects the model."""
+        return any(key in (('model_options', 'use_api'), ('model_options', 'hedge'))
+                   or (key[:2] == ('model_options', 'local') and len(key) > 2 and key[2] in MODEL_OPTION_KEYS)
+                   for key in changed_keys)
+
+    def get_model(self):
+        """
+        Return the model for the current configuration, loading and warming it up if it is not cached.
+        """
+        with self.lock:
+            key = self.model_key()
+            if key in self.cache:
+                ConfigManager.console_print('Using cached local model.')
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+            if ConfigManager.get_config_value('model_options', 'local', 'use_daemon'):
+                model = self.connect_daemon()
+            else:
+                model = create_local_model()
+                self.warm_up(model)
+            self.cache[key] = model
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return model
+
+    @staticmethod
+    def connect_daemon():
+        """
+        Return a client for the model hosted by the model daemon, or a local model if daemons are unsupported.
+        """
+        from model_daemon import DaemonModel, is_supported
+
+        if not is_supported():
+            ConfigManager.console_print('The model daemon is not supported on this platform. Loading the model locally.')
+            model = create_local_model()
+            ModelManager.warm_up(model)
+            return model
+        return DaemonModel(ConfigManager.get_config_value('model_options', 'local', 'daemon_socket'))
+
+    def load_async(self, on_loaded=None):
+        """
+        Load the model for the current configuration on a background thread.
+
+        :param on_loaded: Called from the background thread once the model is ready
+        """
+        self.ready.clear()
+        self.load_generation += 1
+        generation = self.load_generation
+
+        def load():
+            start_time = time.perf_counter()
+            try:
+                model = self.get_model()
+            except Exception:
+                traceback.print_exc()
+                model = None
+            if generation != self.load_generation:
+                return  # A newer load was started while this one was running
+
+            if model is not None:
+                self.model = model
+            self.load_time = time.perf_counter() - start_time
+            ConfigManager.console_print(f'Local model ready in {self.load_time:.2f} seconds.')
+            self.ready.set()
+            if on_loaded:
+                on_loaded()
+
+        Thread(target=load, daemon=True).start()
+
+    def wait_for_model(self):
+        """Block until the model being loaded is ready and return it."""
+        self.ready.wait()
+        return self.model
+
+    def is_loading(self):
+        """Check whether a model is currently being loaded."""
+        return not self.ready.is_set()
+
+    @staticmethod
+    def warm_up(model):
+        """
+        Run one short inference so CTranslate2's lazy initialization is not paid by the first dictation.
+        """
+        start_time = time.perf_counter()
+        audio = np.random.default_rng(0).normal(0, 0.01, 16000).astype(np.float32)
+        segments, _ = model.transcribe(audio, beam_size=1, without_timestamps=True)
+        list(segments)
+        ConfigManager.console_print(f'Local model warmed up in {time.perf_counter() - start_time:.2f} seconds.')
+
+    def clear(self):
+        """Drop all cached models."""
+        self.cache.clear()
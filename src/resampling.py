@@ -0,0 +1,107 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_polyphase_filter(up, down, taps_per_phase=48, beta=8.0):
+    """
+    Design a Kaiser-windowed sinc low-pass filter for resampling by up / down, split into phases.
+
+    :param up: Upsampling factor
+    :param down: Downsampling factor
+    :param taps_per_phase: Number of input samples each output sample is computed from
+    :param beta: Kaiser window shape; higher trades a wider transition band for more stopband attenuation
+    :return: float32 array of shape (up, taps_per_phase); row p holds the taps of phase p
+    """
+    length = up * taps_per_phase
+    # Cut off a little below the lower Nyquist frequency, relative to the upsampled rate
+    cutoff = 0.45 / max(up, down)
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+    taps *= up / taps.sum()
+    return taps.reshape(taps_per_phase, up).T.astype(np.float32)
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler, e.g. from 44.1 or 48 kHz down to 16 kHz.
+
+    Each output sample is the dot product of one phase of a precomputed filter with the
+    input samples before it, so only the output samples are ever computed; the zero-stuffed
+    upsampled signal is never built. Blocks of any length can be passed in, and the filter
+    state carries over between them.
+    """
+
+    def __init__(self, input_rate, output_rate, taps_per_phase=48):
+        """
+        Initialize the PolyphaseResampler.
+
+        :param input_rate: Sample rate of the input in Hz
+        :param output_rate: Sample rate of the output in Hz
+        :param taps_per_phase: Filter length in input samples
+        """
+        divisor = gcd(int(input_rate), int(output_rate))
+        self.up = int(output_rate) // divisor
+        self.down = int(input_rate) // divisor
+        self.taps = taps_per_phase
+        # Reversed, so that a window of input samples in time order multiplies its phase directly
+        self.phases = design_polyphase_filter(self.up, self.down, taps_per_phase)[:, ::-1].copy()
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Position of the next output sample, in upsampled samples from the start of the history
+        self.position = (self.taps - 1) * self.up
+
+    def process(self, block):
+        """
+        Resample the next block of mono samples.
+
+        :param block: 1-D float32 array
+        :return: 1-D float32 array of the output samples that the block completes
+        """
+        buffer = np.concatenate((self.history, block.astype(np.float32, copy=False)))
+        count = max(0, -(-(len(buffer) * self.up - self.position) // self.down))
+        positions = self.position + np.arange(count) * self.down
+        newest = positions // self.up  # Index of the newest input sample of each output sample
+        windows = sliding_window_view(buffer, self.taps)[newest - (self.taps - 1)]
+        output = np.einsum('ij,ij->i', windows, self.phases[positions % self.up])
+
+        consumed = len(buffer) - (self.taps - 1)
+        self.position += count * self.down - consumed * self.up
+        self.history = buffer[consumed:].copy()
+        return output
+
+
+class Downmixer:
+    """
+    Mixes multi-channel blocks down to mono.
+
+    Channels are averaged, except that channels carrying almost no signal compared to the
+    loudest one (such as the unused side of a stereo input with a mono microphone) are left
+    out, so they do not halve the level of the mix. Channel levels are smoothed across blocks
+    so the selection does not flicker.
+    """
+
+    def __init__(self, channels, smoothing=0.9, threshold_db=-30):
+        self.channels = channels
+        self.smoothing = smoothing
+        self.threshold = 10 ** (threshold_db / 10)
+        self.energy = np.zeros(channels, dtype=np.float32)
+
+    def process(self, block):
+        """
+        :param block: int16 array of shape (frames, channels)
+        :return: 1-D float32 array in the int16 range
+        """
+        samples = block.astype(np.float32)
+        if self.channels == 1:
+            return samples[:, 0]
+
+        energy = np.einsum('ij,ij->j', samples, samples) / max(len(samples), 1)
+        self.energy = self.smoothing * self.energy + (1 - self.smoothing) * energy
+        active = self.energy >= self.energy.max() * self.threshold
+        if active.all():
+            return samples.mean(axis=1)
+        return samples[:, active].mean(axis=1)
@@ -1,16 +1,35 @@
+import queue
 import time
 import traceback
-import numpy as np
-import sounddevice as sd
-import webrtcvad
-from PyQt5.QtCore import QThread, QMutex, pyqtSignal
 from collections import deque
-from threading import Event
-
-from transcription import transcribe
+from PyQt5.QtCore import QThread, QMutex, pyqtSignal
+from threading import Event, Thread
+
+from audio_buffer import AudioArena
+from audio_capture import AudioCapture
+from history import TranscriptionHistory
+from session_archive import SessionArchive
+from tracing import Tracer
+from vad import create_vad_engine, Endpointer, VADWorker
+from transcription import transcribe, StreamingTranscriber
 from utils import ConfigManager
 
 
+class TranscriptionJob:
+    """
+    A finished recording, or an utterance of a continuous recording, waiting to be transcribed.
+    """
+
+    def __init__(self, audio_data, sample_rate, streamer=None, trace=None, is_segment=False, stream_thread=None):
+        self.audio_data = audio_data
+        self.sample_rate = sample_rate
+        self.streamer = streamer
+        self.stream_thread = stream_thread  # Still updating the streamer until it notices the recording is done
+        self.trace = trace
+        self.is_segment = is_segment
+        self.queued_at = time.monotonic()
+
+
 class ResultThread(QThread):
     """
     A thread class for handling audio recording, transcription, and result processing.
@@ -18,136 +37,407 @@ class ResultThread(QThread):
     This class manages the entire process of:
     1. Recording audio from the microphone
     2. Detecting speech and silence
-    3. Saving the recorded audio as numpy array
+    3. Saving the recorded audio into a preallocated numpy arena
     4. Transcribing the audio
     5. Emitting the transcription result
 
+    Recording runs on this thread and transcription on a worker thread. Each finished
+    recording is queued to the worker as a TranscriptionJob, so the next dictation can be
+    recorded while the previous one is decoded. The worker handles one job at a time, so
+    results are emitted in the order the recordings were made. At most
+    max_queued_recordings jobs can be pending; until one is done, no new recording starts.
+
+    In the continuous recording mode, each utterance is queued as soon as the endpointer
+    closes it, while recording goes on. In the voice_activity_detection mode, the recording
+    stops at the first endpoint.
+
     Signals:
         statusSignal: Emits the current status of the thread (e.g., 'recording', 'transcribing', 'idle')
-        resultSignal: Emits the transcription result
+        resultSignal: Emits the transcription result and the trace of its dictation (or None)
+        partialSignal: Emits the partial transcription while recording when streaming is enabled
+        queueSignal: Emits the number of pending jobs and the time.monotonic() at which the oldest was queued
     """
 
     statusSignal = pyqtSignal(str)
-    resultSignal = pyqtSignal(str)
+    resultSignal = pyqtSignal(str, object)
+    partialSignal = pyqtSignal(str)
+    queueSignal = pyqtSignal(int, float)
 
-    def __init__(self, local_model=None):
+    def __init__(self, model_manager=None):
         """
         Initialize the ResultThread.
 
-        :param local_model: Local transcription model (if applicable)
+        The thread is long-lived: it waits for start_recording() and records one dictation
+        at a time until stop() is called.
+
+        :param model_manager: ModelManager providing the local transcription model (if applicable)
         """
         super().__init__()
-        self.local_model = local_model
+        self.model_manager = model_manager
         self.is_recording = False
+        self.is_busy = False
         self.is_running = True
         self.sample_rate = None
         self.mutex = QMutex()
+        self.recording = AudioArena(0)
+        self.recording_stopped = Event()
+        self.activation = Event()
+        self.capture = None
+        self.capture_changed = True
+        self.trace = None
+        self.jobs = queue.Queue()
+        self.pending = deque()  # Queue times of the jobs waiting for or undergoing transcription
+        self.worker = Thread(target=self._transcribe_jobs, daemon=True)
+
+    def start_recording(self, trace=None):
+        """
+        Start a new recording session. Ignored while recording, or while max_queued_recordings
+        recordings are still waiting for transcription.
+
+        :param trace: Trace that receives the stage timings of this dictation
+        :return: 'started', or why the recording was not started: 'recording' or 'queue_full'
+        """
+        return self._start_or_stop_recording(trace, stop_if_recording=False)
+
+    def toggle_recording(self, trace=None):
+        """
+        Stop the recording in progress, or else start a new one. The choice is made under the
+        lock, so a recording that ends in the meantime is not mistaken for a full queue.
+
+        :param trace: Trace that receives the stage timings of the new dictation, if one is started
+        :return: 'stopped', 'started' or 'queue_full'
+        """
+        return self._start_or_stop_recording(trace, stop_if_recording=True)
+
+    def _start_or_stop_recording(self, trace, stop_if_recording):
+        max_queued = ConfigManager.get_config_snapshot().recording_options.max_queued_recordings or 0
+        self.mutex.lock()
+        try:
+            if self.is_busy:
+                if not stop_if_recording:
+                    return 'recording'
+                self.is_recording = False
+                outcome = 'stopped'
+            elif max_queued and len(self.pending) >= max_queued:
+                ConfigManager.console_print(f'Not recording: {len(self.pending)} recordings are waiting for transcription.')
+                return 'queue_full'
+            else:
+                self.trace = trace
+                self.is_busy = True
+                self.is_recording = True
+                self.recording_stopped.clear()
+                outcome = 'started'
+        finally:
+            self.mutex.unlock()
+        if outcome == 'stopped':
+            self.recording_stopped.set()
+        else:
+            self.activation.set()
+        return outcome
 
     def stop_recording(self):
         """Stop the current recording session."""
         self.mutex.lock()
         self.is_recording = False
         self.mutex.unlock()
+        self.recording_stopped.set()
 
     def stop(self):
         """Stop the entire thread execution."""
         self.mutex.lock()
         self.is_running = False
         self.mutex.unlock()
+        self.recording_stopped.set()
+        self.activation.set()
+        self.jobs.put(None)
         self.statusSignal.emit('idle')
         self.wait()
 
+    def update_capture(self):
+        """
+        Open, reopen or close the always-warm capture stream to match the recording options.
+
+        Safe to call at any time; if a dictation is in progress the change is applied after it.
+        """
+        self.capture_changed = True
+        if not self.is_busy:
+            self.activation.set()
+
     def run(self):
         """Main execution method for the thread."""
-        try:
-            if not self.is_running:
-                return
-
-            self.mutex.lock()
-            self.is_recording = True
-            self.mutex.unlock()
+        self.worker.start()
+        while self.is_running:
+            if self.capture_changed:
+                self._apply_capture_options()
 
+            self.activation.wait()
+            self.activation.clear()
+            if not self.is_running:
+                break
+            if not self.is_busy:
+                continue  # Woken up to apply capture options
+
+            try:
+                self._handle_dictation()
+            finally:
+                self.mutex.lock()
+                self.is_busy = False
+                self.mutex.unlock()
+                self._emit_status()
+
+        if self.capture:
+            self.capture.close()
+
+    def _handle_dictation(self):
+        """Record a single dictation and queue it for transcription."""
+        continuous = False
+        try:
             self.statusSignal.emit('recording')
             ConfigManager.console_print('Recording...')
-            audio_data = self._record_audio()
 
-            if not self.is_running:
-                return
+            streamer = None
+            stream_thread = None
+            recording_done = Event()
+            snapshot = ConfigManager.get_config_snapshot()
+            model_options = snapshot.model_options
+            continuous = snapshot.recording_options.recording_mode == 'continuous'
+            if continuous:
+                # Segments are transcribed and emitted as they are closed; one trace cannot cover them
+                self.trace = None
+            elif model_options.local.streaming and not model_options.use_api:
+                streamer = StreamingTranscriber(None)
+                stream_thread = Thread(target=self._stream_partials, args=(streamer, recording_done), daemon=True)
+                stream_thread.start()
+
+            try:
+                audio_data = self._record_audio()
+            finally:
+                # The streaming thread is not joined here, so the next recording can start while it
+                # finishes its last pass; the transcription worker waits for it instead
+                recording_done.set()
+
+            if audio_data is not None and self.is_running:
+                self._queue_job(TranscriptionJob(audio_data, self.sample_rate, streamer, self.trace,
+                                                 is_segment=continuous, stream_thread=stream_thread))
+
+        except Exception:
+            traceback.print_exc()
+            if not continuous:
+                self.resultSignal.emit('', self.trace)
+        finally:
+            self.stop_recording()
 
-            if audio_data is None:
-                self.statusSignal.emit('idle')
+    def _queue_job(self, job):
+        """Hand a recording to the transcription worker."""
+        if job.trace:
+            job.trace.mark('queue_wait')
+        self.mutex.lock()
+        self.pending.append(job.queued_at)
+        self.mutex.unlock()
+        self.jobs.put(job)
+        self._emit_status()
+
+    def _emit_status(self):
+        """
+        Emit the queue depth, and the 'transcribing' or 'idle' status unless a recording is in progress.
+        """
+        # Read and emit under the lock, so the recording and worker threads cannot emit stale states out of order
+        self.mutex.lock()
+        try:
+            self.queueSignal.emit(len(self.pending), self.pending[0] if self.pending else 0.0)
+            if not self.is_busy and self.is_running:
+                self.statusSignal.emit('transcribing' if self.pending else 'idle')
+        finally:
+            self.mutex.unlock()
+
+    def _transcribe_jobs(self):
+        """
+        Transcribe queued recordings one at a time, in the order they were made, and emit each result.
+        """
+        while True:
+            job = self.jobs.get()
+            if job is None:
                 return
+            try:
+                if self.is_running:
+                    self._transcribe_job(job)
+            finally:
+                self.mutex.lock()
+                self.pending.popleft()
+                self.mutex.unlock()
+                self._emit_status()
+
+    def _transcribe_job(self, job):
+        """Transcribe a single job and emit its result."""
+        queue_seconds = time.monotonic() - job.queued_at
+        if job.trace:
+            job.trace.since('queue_wait', 'queue_wait')
+        try:
+            local_model = self._wait_for_model()
 
-            self.statusSignal.emit('transcribing')
-            ConfigManager.console_print('Transcribing...')
+            if not job.is_segment:
+                ConfigManager.console_print('Transcribing...')
 
             # Time the transcription process
             start_time = time.time()
-            result = transcribe(audio_data, self.local_model)
+            if job.stream_thread:
+                job.stream_thread.join()
+            if job.streamer and job.streamer.local_model is None:
+                job.streamer.local_model = local_model  # The model loaded after the recording stopped
+            result = transcribe(job.audio_data, local_model, job.streamer, job.trace)
             end_time = time.time()
 
             transcription_time = end_time - start_time
-            ConfigManager.console_print(f'Transcription completed in {transcription_time:.2f} seconds. Post-processed line: {result}')
-
-            if not self.is_running:
-                return
+            audio_seconds = len(job.audio_data) / job.sample_rate
+            ConfigManager.console_print(f'Transcription completed in {transcription_time:.2f} seconds after '
+                                        f'{queue_seconds:.2f} seconds in the queue. Post-processed line: {result}')
+            if self.is_running and not (job.is_segment and not result.strip()):
+                if job.trace:
+                    job.trace.attributes['audio_seconds'] = round(audio_seconds, 3)
+                    job.trace.mark('signal_hop')
+                self.resultSignal.emit(result, job.trace)
+
+            # After the result is out, so archiving and history can neither delay nor replace it
+            SessionArchive.record(job.audio_data, job.sample_rate, result, transcription_time)
+            TranscriptionHistory.add(result, audio_seconds, transcription_time)
+
+        except Exception:
+            traceback.print_exc()
+            if not job.is_segment:
+                self.resultSignal.emit('', job.trace)
 
-            self.statusSignal.emit('idle')
-            self.resultSignal.emit(result)
+    def _apply_capture_options(self):
+        """Keep the always-warm capture stream in line with the recording options."""
+        self.capture_changed = False
+        recording_options = ConfigManager.get_config_section('recording_options')
+        if not recording_options.get('always_on_capture'):
+            if self.capture:
+                self.capture.close()
+                self.capture = None
+            return
+
+        capture = AudioCapture.from_config(self._frame_size(), pre_roll=True)
+        if self.capture and self.capture.matches(capture):
+            return
+        if self.capture:
+            self.capture.close()
 
-        except Exception as e:
+        try:
+            capture.open()
+            self.capture = capture
+            ConfigManager.console_print('Always-on audio capture started.')
+        except Exception:
             traceback.print_exc()
-            self.statusSignal.emit('error')
-            self.resultSignal.emit('')
-        finally:
-            self.stop_recording()
+            self.capture = None
+
+    def _frame_size(self):
+        """Return the number of samples in a 30 ms frame at the configured sample rate."""
+        sample_rate = ConfigManager.get_config_value('recording_options', 'sample_rate') or 16000
+        frame_duration_ms = 30  # 30ms frame duration for WebRTC VAD
+        return int(sample_rate * (frame_duration_ms / 1000.0))
+
+    def _wait_for_model(self):
+        """
+        Return the local model, waiting for it if it is still loading. The recorded audio is held until then.
+        """
+        model_options = ConfigManager.get_config_snapshot().model_options
+        if not self.model_manager or (model_options.use_api and not model_options.hedge):
+            return None
+        if self.model_manager.is_loading():
+            if not self.is_busy:
+                self.statusSignal.emit('loading')
+            ConfigManager.console_print('Waiting for the local model to finish loading...')
+        return self.model_manager.wait_for_model()
 
     def _record_audio(self):
         """
-        Record audio from the microphone and save it to a temporary file.
+        Record audio from the microphone into a preallocated float32 arena.
+
+        If the always-warm capture stream is open, the recording starts with its pre-roll;
+        otherwise a stream is opened just for this recording.
 
-        :return: numpy array of audio data, or None if the recording is too short
+        :return: float32 numpy array of audio data, or None if the recording is too short
         """
         recording_options = ConfigManager.get_config_section('recording_options')
         self.sample_rate = recording_options.get('sample_rate') or 16000
-        frame_duration_ms = 30  # 30ms frame duration for WebRTC VAD
-        frame_size = int(self.sample_rate * (frame_duration_ms / 1000.0))
-
-        # Create VAD only for filtering silence
-        vad = webrtcvad.Vad(2)  # VAD aggressiveness: 0 to 3, 3 being the most aggressive
-
-        audio_buffer = deque(maxlen=frame_size)
-        recording = []
-
-        data_ready = Event()
+        frame_size = self._frame_size()
+
+        # Create VAD for filtering silence and, in the continuous and VAD modes, finding the end of each utterance
+        vad = create_vad_engine(recording_options, self.sample_rate)
+        recording_mode = recording_options.get('recording_mode')
+        endpointer = None
+        on_endpoint = None
+        if recording_mode in ('continuous', 'voice_activity_detection'):
+            endpointer = Endpointer(30, recording_options.get('silence_duration') or 900)
+            on_endpoint = self._dispatch_segment if recording_mode == 'continuous' else self.stop_recording
+
+        capture = self.capture or AudioCapture.from_config(frame_size)
+        self.recording = AudioArena(self.sample_rate * 60)
+        vad_worker = VADWorker(vad, capture.audio_buffer, self.recording, frame_size, trace=self.trace,
+                               endpointer=endpointer, on_endpoint=on_endpoint)
+
+        vad_worker.start()
+        capture.begin(vad_worker.notify)
+        try:
+            with Tracer.span(self.trace, 'stream_open'):
+                capture.open()
+            self.recording_stopped.wait()
+        finally:
+            capture.end()
+            if capture is not self.capture:
+                capture.close()
+            vad_worker.stop()
 
-        def audio_callback(indata, frames, time, status):
-            if status:
-                ConfigManager.console_print(f"Audio callback status: {status}")
-            audio_buffer.extend(indata[:, 0])
-            data_ready.set()
+        audio_data = self.recording.view()
+        duration = len(audio_data) / self.sample_rate
 
-        with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16',
-                            blocksize=frame_size, device=recording_options.get('sound_device'),
-                            callback=audio_callback):
-            while self.is_running and self.is_recording:
-                data_ready.wait()
-                data_ready.clear()
+        ConfigManager.console_print(f'Recording finished. Size: {audio_data.size} samples, Duration: {duration:.2f} seconds')
 
-                if len(audio_buffer) < frame_size:
-                    continue
+        if not self._is_long_enough(audio_data):
+            ConfigManager.console_print('Discarding the recording: it is shorter than min_duration.')
+            return None
+        return audio_data
 
-                # Save frame
-                frame = np.array(list(audio_buffer), dtype=np.int16)
-                audio_buffer.clear()
+    def _is_long_enough(self, audio_data):
+        """Check whether a recording or segment is at least min_duration long."""
+        min_duration = ConfigManager.get_config_snapshot().recording_options.min_duration or 0
+        return audio_data.size > 0 and audio_data.size * 1000 >= min_duration * self.sample_rate
 
-                # Filter out silence using VAD
-                if vad.is_speech(frame.tobytes(), self.sample_rate):
-                    recording.extend(frame)
+    def _dispatch_segment(self):
+        """
+        Called on the VAD worker at the end of each utterance in the continuous mode. Queues the
+        utterance for transcription and starts the next one in the same arena.
 
-        audio_data = np.array(recording, dtype=np.int16)
-        duration = len(audio_data) / self.sample_rate
+        Utterances are not limited by max_queued_recordings, as the VAD worker cannot wait.
+        """
+        segment = self.recording.view().copy()
+        self.recording.clear()
+        if self._is_long_enough(segment):
+            ConfigManager.console_print(f'Utterance of {segment.size / self.sample_rate:.2f} seconds queued for transcription.')
+            self._queue_job(TranscriptionJob(segment, self.sample_rate, is_segment=True))
 
-        ConfigManager.console_print(f'Recording finished. Size: {audio_data.size} samples, Duration: {duration:.2f} seconds')
+    def _stream_partials(self, streamer, recording_done):
+        """
+        Periodically re-decode the recording so far and emit the partial transcription.
+        No partials are shown while the local model is still loading.
 
-        return audio_data
+        :param streamer: StreamingTranscriber holding the confirmed prefix
+        :param recording_done: Event set once this recording has stopped
+        """
+        interval = ConfigManager.get_config_snapshot().model_options.local.streaming_interval / 1000.0
+        while not recording_done.wait(interval):
+            if streamer.local_model is None and self.model_manager:
+                if self.model_manager.is_loading():
+                    continue
+                streamer.local_model = self.model_manager.wait_for_model()
+            recording = self.recording
+            if not self.sample_rate or len(recording) < self.sample_rate:
+                continue  # Wait for at least a second of speech
+
+            audio_data = recording.view()
+            try:
+                confirmed, tentative = streamer.update(audio_data)
+            except Exception:
+                traceback.print_exc()
+                return
+            self.partialSignal.emit((confirmed + tentative).strip())
@@ -0,0 +1,237 @@
+"""
+Archive of dictation audio, and replay of archived dictations through the current pipeline.
+
+When archive_sessions is enabled, the audio of every dictation is written as a FLAC file
+on a background thread, and a line with its result, transcription time and a reference to
+the configuration it was transcribed with is appended to index.jsonl. Each distinct
+configuration is stored once in configs.jsonl.
+
+Replay re-transcribes archived dictations with the current model and settings, as fast as
+the model allows, and reports the latency and the words that changed compared with the
+archived result.
+
+Usage: python src/session_archive.py [--archive archive] [--ids ID ...] [--since 2024-06-01]
+                                     [--last 20] [--changed-only] [--report replay.jsonl]
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+import wave
+
+import numpy as np
+
+from utils import ConfigManager
+
+
+class SessionArchive:
+    """
+    Writes the audio, result and configuration of each dictation to the archive directory.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, 'index.jsonl')
+        self.configs_path = os.path.join(archive_dir, 'configs.jsonl')
+        os.makedirs(archive_dir, exist_ok=True)
+        self.config_hashes = {entry['hash'] for entry in read_jsonl(self.configs_path)}
+        self.queue = queue.Queue()
+        threading.Thread(target=self._write_entries, daemon=True).start()
+
+    @classmethod
+    def record(cls, audio_data, sample_rate, text, transcribe_seconds):
+        """
+        Queue a dictation for archiving, if archive_sessions is enabled.
+
+        :param audio_data: float32 audio that was transcribed
+        :param sample_rate: Sample rate of the audio
+        :param text: Post-processed result
+        :param transcribe_seconds: Time the transcription took
+        """
+        misc = ConfigManager.get_config_snapshot().misc
+        if not misc.archive_sessions:
+            return
+        try:
+            with cls._lock:
+                if cls._instance is None or cls._instance.archive_dir != misc.archive_dir:
+                    cls._instance = cls(misc.archive_dir)
+                instance = cls._instance
+
+            config = ConfigManager.get_config_copy()
+            config.get('model_options', {}).get('api', {}).pop('api_key', None)
+            instance.queue.put({
+                'id': uuid.uuid4().hex[:12],
+                'timestamp': time.time(),
+                'sample_rate': sample_rate,
+                'text': text,
+                'transcribe_ms': round(transcribe_seconds * 1000, 1),
+                'audio': audio_data,  # Owned by the transcription job, so it is not copied here
+                'config': config,
+            })
+        except Exception as e:
+            ConfigManager.console_print(f'Could not archive the dictation: {e}')
+
+    def _write_entries(self):
+        """Encode queued dictations and append them to the index on a background thread."""
+        from api_client import encode_audio
+
+        while True:
+            entry = self.queue.get()
+            try:
+                samples = (np.clip(entry.pop('audio'), -1.0, 1.0) * 32767).astype(np.int16)
+                config = entry.pop('config')
+                config_text = json.dumps(config, sort_keys=True)
+                config_hash = hashlib.sha256(config_text.encode('utf-8')).hexdigest()[:16]
+                if config_hash not in self.config_hashes:
+                    with open(self.configs_path, 'a', encoding='utf-8') as file:
+                        file.write(json.dumps({'hash': config_hash, 'config': config}) + '\n')
+                    self.config_hashes.add(config_hash)
+
+                name, data, _ = encode_audio(samples, entry['sample_rate'], 'flac')
+                day = time.strftime('%Y-%m-%d', time.localtime(entry['timestamp']))
+                relative_path = os.path.join('segments', day, entry['id'] + os.path.splitext(name)[1])
+                os.makedirs(os.path.join(self.archive_dir, 'segments', day), exist_ok=True)
+                with open(os.path.join(self.archive_dir, relative_path), 'wb') as file:
+                    file.write(data)
+
+                # The index line is written last, so it never refers to a missing file
+                entry.update(file=relative_path, duration=round(len(samples) / entry['sample_rate'], 3),
+                             config=config_hash)
+                with open(self.index_path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(entry) + '\n')
+            except Exception as e:
+                ConfigManager.console_print(f'Error archiving dictation: {e}')
+
+
+def read_jsonl(path):
+    """Read a JSON-lines file, skipping a partially written last line."""
+    if not os.path.isfile(path):
+        return []
+    entries = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def load_archived_audio(path, sample_rate):
+    """Load an archived clip as float32 at 16 kHz."""
+    if sample_rate != 16000:
+        from audio_files import load_audio
+        return load_audio(path)
+    if path.endswith('.wav'):
+        with wave.open(path, 'rb') as file:
+            samples = np.frombuffer(file.readframes(file.getnframes()), dtype=np.int16)
+    else:
+        import soundfile as sf
+        samples, _ = sf.read(path, dtype='int16')
+    return samples.astype(np.float32) / 32768.0
+
+
+def diff_words(old, new):
+    """
+    Compare two texts word by word.
+
+    :return: Tuple of (number of changed words, diff string with removed words as [-word-]
+             and added words as {+word+})
+    """
+    old_words = re.sub(r"[^\w\s']", ' ', old.lower()).split()
+    new_words = re.sub(r"[^\w\s']", ' ', new.lower()).split()
+    changes = 0
+    parts = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(a=old_words, b=new_words, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            parts.extend(old_words[i1:i2])
+            continue
+        changes += max(i2 - i1, j2 - j1)
+        parts.extend(f'[-{word}-]' for word in old_words[i1:i2])
+        parts.extend(f'{{+{word}+}}' for word in new_words[j1:j2])
+    return changes, ' '.join(parts)
+
+
+def select_entries(entries, ids=None, since=None, last=None):
+    if ids:
+        entries = [entry for entry in entries if entry['id'] in ids]
+    if since:
+        since_time = time.mktime(time.strptime(since, '%Y-%m-%d'))
+        entries = [entry for entry in entries if entry['timestamp'] >= since_time]
+    if last:
+        entries = entries[-last:]
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay archived dictations through the current pipeline.')
+    parser.add_argument('--archive', help='Archive directory (default: archive_dir from the config)')
+    parser.add_argument('--ids', nargs='+', help='Only replay these dictations')
+    parser.add_argument('--since', help='Only replay dictations from this date on (YYYY-MM-DD)')
+    parser.add_argument('--last', type=int, help='Only replay the most recent N dictations')
+    parser.add_argument('--changed-only', action='store_true', help='Only print dictations whose text changed')
+    parser.add_argument('--report', help='Also write one JSON line per dictation to this file')
+    args = parser.parse_args()
+
+    ConfigManager.initialize()
+    from transcription import create_local_model, transcribe
+
+    archive_dir = args.archive or ConfigManager.get_config_value('misc', 'archive_dir')
+    entries = select_entries(read_jsonl(os.path.join(archive_dir, 'index.jsonl')), args.ids, args.since, args.last)
+    if not entries:
+        sys.exit(f'No archived dictations to replay in {archive_dir}.')
+
+    model_options = ConfigManager.get_config_snapshot().model_options
+    local_model = None if model_options.use_api and not model_options.hedge else create_local_model()
+
+    print(f'Replaying {len(entries)} dictations.')
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    audio_seconds = replay_seconds = original_seconds = 0.0
+    changed = changed_words = total_words = 0
+    try:
+        for entry in entries:
+            audio = load_archived_audio(os.path.join(archive_dir, entry['file']), entry['sample_rate'])
+            start = time.perf_counter()
+            text = transcribe(audio, local_model)
+            elapsed = time.perf_counter() - start
+
+            changes, diff = diff_words(entry['text'], text)
+            audio_seconds += entry['duration']
+            replay_seconds += elapsed
+            original_seconds += entry['transcribe_ms'] / 1000
+            changed += bool(changes)
+            changed_words += changes
+            total_words += len(entry['text'].split())
+
+            if changes or not args.changed_only:
+                print(f'{entry["id"]} {entry["duration"]:6.1f} s audio  {entry["transcribe_ms"]:8.0f} -> '
+                      f'{elapsed * 1000:8.0f} ms  {changes} words changed')
+                if changes:
+                    print(f'    {diff}')
+            if report:
+                report.write(json.dumps({'id': entry['id'], 'original_text': entry['text'], 'text': text,
+                                         'original_ms': entry['transcribe_ms'], 'replay_ms': round(elapsed * 1000, 1),
+                                         'words_changed': changes}) + '\n')
+    finally:
+        if report:
+            report.close()
+
+    print(f'\n{len(entries)} dictations, {audio_seconds:.1f} s of audio replayed in {replay_seconds:.1f} s '
+          f'({audio_seconds / max(replay_seconds, 1e-9):.1f}x realtime).')
+    print(f'Transcription time: {original_seconds:.1f} s originally, {replay_seconds:.1f} s now.')
+    print(f'{changed} dictations changed, {changed_words} of {total_words} words '
+          f'({changed_words / max(total_words, 1):.1%}).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import importlib.abc
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module loader to time the execution of the module's body."""
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module its real loader, for code that inspects __loader__ or __spec__.loader
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.profiler.begin_import(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.end_import()
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """A meta path finder that defers to the other finders and times the modules they load."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(spec.loader, self.profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """
+    Records a timeline of the start-up: the time spent importing each module and in each
+    initialization phase, relative to the moment profiling was enabled.
+
+    Disabled unless enable() is called (by the --profile-startup flag); phase() is then a no-op.
+    """
+
+    _instance = None
+    json_path = None  # File to write the report to, if any
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.phases = []
+        self.marks = []
+        self.imports = []
+        self.import_stack = []
+
+    @classmethod
+    def enable(cls):
+        """Start recording; call as early as possible so the imports of the app are timed."""
+        if cls._instance is None:
+            cls._instance = cls()
+            sys.meta_path.insert(0, _ImportTimer(cls._instance))
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._instance is not None
+
+    @classmethod
+    def phase(cls, name):
+        """Return a context manager that records the time spent in its block as an init phase."""
+        if cls._instance is None:
+            return nullcontext()
+        return cls._instance._phase(name)
+
+    @contextmanager
+    def _phase(self, name):
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start_ns - self.start_ns, time.perf_counter_ns() - start_ns))
+
+    @classmethod
+    def mark(cls, name):
+        """Record that a milestone (e.g. 'event loop running') has been reached."""
+        if cls._instance is not None:
+            cls._instance.marks.append((name, time.perf_counter_ns() - cls._instance.start_ns))
+
+    def begin_import(self, name):
+        self.import_stack.append([name, time.perf_counter_ns(), 0])
+
+    def end_import(self):
+        name, start_ns, children_ns = self.import_stack.pop()
+        total_ns = time.perf_counter_ns() - start_ns
+        if self.import_stack:
+            self.import_stack[-1][2] += total_ns
+        self.imports.append({'module': name, 'depth': len(self.import_stack),
+                             'start_ms': (start_ns - self.start_ns) / 1e6,
+                             'total_ms': total_ns / 1e6, 'self_ms': (total_ns - children_ns) / 1e6})
+
+    @classmethod
+    def report(cls, json_path=None, min_ms=1.0, max_depth=3):
+        """
+        Print the timeline and the imports as a tree, and optionally write them to a JSON file.
+
+        :param min_ms: Leave out imports that took less than this
+        :param max_depth: Leave out imports nested deeper than this
+        """
+        profiler = cls._instance
+        if profiler is None:
+            return
+
+        print('\nStart-up timeline (ms since launch):')
+        print(f'{"start":>9} {"duration":>9}  phase')
+        for name, offset_ns, duration_ns in profiler.phases:
+            print(f'{offset_ns / 1e6:>9.1f} {duration_ns / 1e6:>9.1f}  {name}')
+        for name, offset_ns in profiler.marks:
+            print(f'{offset_ns / 1e6:>9.1f} {"":>9}  {name}')
+
+        print(f'\nImports taking at least {min_ms} ms, in load order (ms):')
+        print(f'{"start":>9} {"total":>9} {"self":>9}  module')
+        for record in sorted(profiler.imports, key=lambda record: record['start_ms']):
+            if record['total_ms'] >= min_ms and record['depth'] <= max_depth:
+                print(f'{record["start_ms"]:>9.1f} {record["total_ms"]:>9.1f} {record["self_ms"]:>9.1f}  '
+                      f'{"  " * record["depth"]}{record["module"]}')
+
+        if json_path:
+            with open(json_path, 'w') as file:
+                json.dump({
+                    'phases': [{'phase': name, 'start_ms': offset / 1e6, 'duration_ms': duration / 1e6}
+                               for name, offset, duration in profiler.phases],
+                    'marks': [{'mark': name, 'ms': offset / 1e6} for name, offset in profiler.marks],
+                    'imports': profiler.imports,
+                }, file, indent=2)
+            print(f'\nStart-up profile written to {json_path}')
@@ -0,0 +1,246 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Upper bounds in seconds of the latency histogram buckets
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Trace:
+    """
+    The stage timings of a single dictation, from the hotkey press to the text appearing.
+    """
+
+    __slots__ = ('trace_id', 'start_ns', 'spans', 'marks', 'attributes')
+
+    def __init__(self, start_ns=None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.start_ns = start_ns or time.perf_counter_ns()
+        self.spans = {}
+        self.marks = {}
+        self.attributes = {}
+
+    def add(self, name, duration_ns):
+        """Add a duration to a stage; repeated stages (e.g. VAD batches) are summed."""
+        self.spans[name] = self.spans.get(name, 0) + duration_ns
+
+    def mark(self, name):
+        """Remember the current time, to end a stage that spans threads with since()."""
+        self.marks[name] = time.perf_counter_ns()
+
+    def since(self, mark, name):
+        """Record the time from a mark until now as a stage."""
+        if mark in self.marks:
+            self.add(name, time.perf_counter_ns() - self.marks.pop(mark))
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'timestamp': time.time(),
+            'total_ms': round((time.perf_counter_ns() - self.start_ns) / 1e6, 3),
+            'spans_ms': {name: round(duration / 1e6, 3) for name, duration in self.spans.items()},
+            **self.attributes,
+        }
+
+
+class Span:
+    """
+    Context manager that adds the time spent in its block to a stage of a trace. Does nothing without a trace.
+    """
+
+    __slots__ = ('trace', 'name', 'start_ns')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter_ns() - self.start_ns)
+        return False
+
+
+class Histogram:
+    """A cumulative latency histogram with fixed buckets, in the style of Prometheus."""
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """Return (upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip(HISTOGRAM_BUCKETS + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Tracer:
+    """
+    Collects per-dictation traces, writes them to a rolling JSON-lines file and aggregates
+    per-stage latency histograms that can be served over a local HTTP endpoint.
+    """
+
+    _instance = None
+
+    def __init__(self, trace_file, max_bytes, backups):
+        self.trace_file = trace_file
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.server = None
+        threading.Thread(target=self._write_traces, daemon=True).start()
+
+    @classmethod
+    def initialize(cls, trace_file='traces.jsonl', max_bytes=5 * 1024 * 1024, backups=3, metrics_port=None):
+        """
+        Enable tracing. Until this is called, start_trace() returns None and all spans are no-ops.
+
+        :param trace_file: Path of the JSON-lines file that receives one line per dictation
+        :param max_bytes: Size at which the file is rotated
+        :param backups: Number of rotated files to keep
+        :param metrics_port: Port for the local metrics endpoint, or None to disable it
+        """
+        if cls._instance is None:
+            cls._instance = cls(trace_file, max_bytes, backups)
+            if metrics_port:
+                cls._instance.serve_metrics(metrics_port)
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._instance is not None
+
+    @classmethod
+    def start_trace(cls, start_ns=None):
+        """
+        Start a trace for a new dictation.
+
+        :param start_ns: perf_counter_ns() timestamp of the hotkey press, if known
+        :return: A Trace, or None if tracing is disabled
+        """
+        if cls._instance is None:
+            return None
+        return Trace(start_ns)
+
+    @staticmethod
+    def span(trace, name):
+        """Return a context manager that times a stage of the given trace (which may be None)."""
+        return Span(trace, name)
+
+    @staticmethod
+    def record(trace, name, start_ns, end_ns=None):
+        """Add a stage that started and ended at the given perf_counter_ns() timestamps."""
+        if trace is not None:
+            trace.add(name, (end_ns or time.perf_counter_ns()) - start_ns)
+
+    @classmethod
+    def finish_trace(cls, trace):
+        """Aggregate the trace into the histograms and queue it for writing."""
+        if trace is None or cls._instance is None:
+            return
+        record = trace.to_dict()
+        instance = cls._instance
+        with instance.lock:
+            for name, duration_ms in list(record['spans_ms'].items()) + [('total', record['total_ms'])]:
+                instance.histograms.setdefault(name, Histogram()).observe(duration_ms / 1000.0)
+        instance.queue.put(record)
+
+    def _write_traces(self):
+        """Append queued traces to the trace file on a background thread, rotating it when it grows too large."""
+        while True:
+            record = self.queue.get()
+            try:
+                if os.path.isfile(self.trace_file) and os.path.getsize(self.trace_file) >= self.max_bytes:
+                    self._rotate()
+                with open(self.trace_file, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(record) + '\n')
+            except OSError as e:
+                print(f'Error writing trace: {e}')
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.trace_file}.{index}'
+            if os.path.isfile(source):
+                os.replace(source, f'{self.trace_file}.{index + 1}')
+        os.replace(self.trace_file, f'{self.trace_file}.1')
+
+    @classmethod
+    def metrics_json(cls):
+        """Return the histograms as a JSON-serializable dictionary."""
+        if cls._instance is None:
+            return {}
+        with cls._instance.lock:
+            return {
+                name: {
+                    'count': histogram.count,
+                    'sum_seconds': histogram.sum,
+                    'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                                for bound, count in histogram.cumulative()},
+                }
+                for name, histogram in cls._instance.histograms.items()
+            }
+
+    @classmethod
+    def metrics_prometheus(cls):
+        """Return the histograms in the Prometheus text exposition format."""
+        lines = ['# HELP whisperwriter_stage_latency_seconds Latency of each dictation stage.',
+                 '# TYPE whisperwriter_stage_latency_seconds histogram']
+        for name, metrics in cls.metrics_json().items():
+            for bound, count in metrics['buckets'].items():
+                lines.append(f'whisperwriter_stage_latency_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'whisperwriter_stage_latency_seconds_sum{{stage="{name}"}} {metrics["sum_seconds"]}')
+            lines.append(f'whisperwriter_stage_latency_seconds_count{{stage="{name}"}} {metrics["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve_metrics(self, port):
+        """Serve /metrics (Prometheus text) and /metrics.json on localhost from a background thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path == '/metrics':
+                    body, content_type = Tracer.metrics_prometheus(), 'text/plain; version=0.0.4'
+                elif handler.path == '/metrics.json':
+                    body, content_type = json.dumps(Tracer.metrics_json()), 'application/json'
+                else:
+                    handler.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', content_type)
+                handler.send_header('Content-Length', str(len(data)))
+                handler.end_headers()
+                handler.wfile.write(data)
+
+            def log_message(handler, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+        except OSError as e:
+            print(f'Error starting metrics endpoint on port {port}: {e}')
+            return
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
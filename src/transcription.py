@@ -1,81 +1,548 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
 import numpy as np
-from faster_whisper import WhisperModel
 
+from tracing import Tracer
 from utils import ConfigManager
 
-def create_local_model():
+# A transcription with more characters per second of audio than this is treated as a runaway decode
+MAX_CHARS_PER_SECOND = 40
+
+def resolve_device(device):
+    """
+    Resolve the configured device to 'cuda' or 'cpu' without paying for a failed CUDA initialization.
+    """
+    if device == 'cpu':
+        return 'cpu'
+    try:
+        import ctranslate2
+        has_cuda = ctranslate2.get_cuda_device_count() > 0
+    except Exception:
+        has_cuda = False
+    if not has_cuda and device == 'cuda':
+        ConfigManager.console_print('No CUDA device found. Using CPU.')
+    return 'cuda' if has_cuda else 'cpu'
+
+def create_local_model(cpu_threads=None):
     """
     Create a local model using the faster-whisper library.
+
+    On the CPU, the compute type and thread counts cached by the autotuner for this machine
+    and model are used, unless a compute type other than 'default' is configured.
+
+    :param cpu_threads: Number of CPU threads to use, overriding the autotuned profile
     """
+    from faster_whisper import WhisperModel
+    from autotune import load_profile
+
     ConfigManager.console_print('Creating local model...')
     local_model_options = ConfigManager.get_config_section('model_options')['local']
     compute_type = local_model_options['compute_type']
     model_path = local_model_options.get('model_path')
-    device = 'cuda'
+    model_name = model_path or local_model_options['model']
+    device = resolve_device(local_model_options.get('device') or 'auto')
 
-    try:
-        if model_path:
-            ConfigManager.console_print(f'Loading model from: {model_path}')
-            model = WhisperModel(model_path,
-                                 device=device,
+    cpu_options = {}
+    profile = load_profile(model_name)
+    if profile:
+        cpu_options = {'cpu_threads': profile.get('cpu_threads', 0), 'num_workers': profile.get('num_workers', 1)}
+        if compute_type == 'default':
+            cpu_options['compute_type'] = profile.get('compute_type', compute_type)
+    if cpu_threads:
+        cpu_options['cpu_threads'] = cpu_threads
+
+    if model_path:
+        ConfigManager.console_print(f'Loading model from: {model_path}')
+
+    model = None
+    if device == 'cuda':
+        try:
+            model = WhisperModel(model_name,
+                                 device='cuda',
                                  compute_type=compute_type,
                                  download_root=None)  # Prevent automatic download
-        else:
-            model = WhisperModel(local_model_options['model'],
-                                 device=device,
-                                 compute_type=compute_type)
-    except Exception as e:
-        print(f'Error initializing WhisperModel: {e}')
-        ConfigManager.console_print('Falling back to CPU.')
-        model = WhisperModel(model_path or local_model_options['model'],
+        except Exception as e:
+            print(f'Error initializing WhisperModel: {e}')
+            ConfigManager.console_print('Falling back to CPU.')
+
+    if model is None:
+        if profile:
+            ConfigManager.console_print(f'Using autotuned CPU profile: {profile}')
+        options = {'compute_type': compute_type, **cpu_options}
+        model = WhisperModel(model_name,
                              device='cpu',
-                             compute_type=compute_type,
-                             download_root=None if model_path else None)
+                             download_root=None,
+                             **options)
 
     ConfigManager.console_print('Local model created.')
     return model
 
-def transcribe_local(audio_data, local_model=None):
+def audio_to_float32(audio_data):
+    """
+    Return the audio as float32 in [-1, 1). float32 input is returned as is, without a copy.
+    """
+    if audio_data.dtype == np.float32:
+        return audio_data
+    return np.multiply(audio_data, np.float32(1 / 32768.0), dtype=np.float32)
+
+def transcribe_local(audio_data, local_model=None, trace=None):
     """
     Transcribe an audio file using a local model.
     """
     if not local_model:
         local_model = create_local_model()
-    model_options = ConfigManager.get_config_section('model_options')
+    model_options = ConfigManager.get_config_snapshot().model_options
+
+    with Tracer.span(trace, 'int16_to_float'):
+        audio_data_float = audio_to_float32(audio_data)
+
+    with Tracer.span(trace, 'model_transcribe'):
+        segments, _ = local_model.transcribe(audio=audio_data_float,
+                                             language=model_options.common.language,
+                                             initial_prompt=model_options.common.initial_prompt,
+                                             condition_on_previous_text=model_options.local.condition_on_previous_text,
+                                             temperature=model_options.common.temperature,
+                                             vad_filter=model_options.local.vad_filter,)
+
+    # Segments are decoded lazily while they are iterated
+    with Tracer.span(trace, 'segment_materialization'):
+        return ''.join([segment.text for segment in segments])
+
+def transcribe_api(audio_data, sample_rate=16000, trace=None):
+    """
+    Transcribe audio using an OpenAI-compatible API, uploading it compressed.
+    """
+    from api_client import APIClient, encode_audio
+
+    model_options = ConfigManager.get_config_snapshot().model_options
 
-    # Convert int16 to float32
-    audio_data_float = audio_data.astype(np.float32) / 32768.0
+    with Tracer.span(trace, 'encode_upload'):
+        audio_file = encode_audio(audio_data, sample_rate, model_options.api.upload_format)
+    ConfigManager.console_print(f'Uploading {len(audio_file[1]) / 1024:.0f} KiB of {audio_file[2]} audio.')
+
+    with Tracer.span(trace, 'api_request'):
+        return APIClient.get_api_client().transcribe(audio_file, {
+            'model': model_options.api.model,
+            'language': model_options.common.language,
+            'prompt': model_options.common.initial_prompt,
+            'temperature': model_options.common.temperature,
+        })
+
+class StreamingTranscriber:
+    """
+    Incrementally transcribe a growing recording while it is still being captured.
+
+    Each call to update() re-decodes the audio after the confirmed prefix. Words that two
+    consecutive passes agree on are locked in and their audio is dropped from the next
+    pass, so the work left when the recording stops is only the unconfirmed tail.
+    """
+
+    def __init__(self, local_model, sample_rate=16000):
+        """
+        Initialize the StreamingTranscriber.
+
+        :param local_model: Local transcription model
+        :param sample_rate: Sample rate of the audio passed to update() and finalize()
+        """
+        self.local_model = local_model
+        self.sample_rate = sample_rate
+        self.confirmed_words = []
+        self.confirmed_samples = 0
+        self.previous_words = []
+
+    @property
+    def confirmed_text(self):
+        """The text that has been locked in so far."""
+        return ''.join(word for word, _ in self.confirmed_words)
+
+    def update(self, audio_data):
+        """
+        Decode the unconfirmed tail of the recording and lock in any newly agreed words.
+
+        :param audio_data: numpy array holding the whole recording so far
+        :return: Tuple of (confirmed text, tentative text)
+        """
+        words = self._decode_tail(audio_data)
+
+        agreed = 0
+        for (word, _), (previous_word, _) in zip(words, self.previous_words):
+            if word.strip().lower() != previous_word.strip().lower():
+                break
+            agreed += 1
+
+        if agreed:
+            self.confirmed_words.extend(words[:agreed])
+            self.confirmed_samples += int(words[agreed - 1][1] * self.sample_rate)
+            words = words[agreed:]
+
+        self.previous_words = words
+        return self.confirmed_text, ''.join(word for word, _ in words)
+
+    def finalize(self, audio_data):
+        """
+        Decode the remaining tail of the recording and return the full transcription.
+
+        :param audio_data: numpy array holding the complete recording
+        :return: The raw transcription of the whole recording
+        """
+        return self.confirmed_text + ''.join(word for word, _ in self._decode_tail(audio_data))
+
+    def _decode_tail(self, audio_data):
+        """
+        Run the model over the audio after the confirmed prefix.
+
+        :return: List of (word, end time in seconds relative to the tail) tuples
+        """
+        tail = audio_data[self.confirmed_samples:]
+        if tail.size == 0:
+            return []
+
+        model_options = ConfigManager.get_config_snapshot().model_options
+        initial_prompt = model_options.common.initial_prompt
+        if self.confirmed_words:
+            # Condition the tail on what has already been said
+            initial_prompt = self.confirmed_text.strip()
+
+        segments, _ = self.local_model.transcribe(audio=audio_to_float32(tail),
+                                                  language=model_options.common.language,
+                                                  initial_prompt=initial_prompt,
+                                                  condition_on_previous_text=model_options.local.condition_on_previous_text,
+                                                  temperature=model_options.common.temperature,
+                                                  vad_filter=model_options.local.vad_filter,
+                                                  word_timestamps=True)
+        return [(word.word, word.end) for segment in segments for word in segment.words or []]
+
+def is_plausible_transcription(text, audio_seconds):
+    """
+    Sanity check a transcription before accepting it: not empty and not far longer than the audio allows.
+    """
+    text = text.strip()
+    return bool(text) and len(text) <= MAX_CHARS_PER_SECOND * audio_seconds + 20
+
+class HedgeStats:
+    """
+    Running totals of hedged transcription: which backend won, how often the hedge was sent
+    and how much latency the hedge saved compared to waiting for the primary backend.
+    """
+
+    lock = threading.Lock()
+    dictations = 0
+    hedges_sent = 0
+    wins = {'local': 0, 'remote': 0}
+    hedge_wins = 0
+    saved_seconds = 0.0
+    rescued = 0
+
+    @classmethod
+    def record(cls, winner, hedge_won, hedge_sent, rescued=False):
+        with cls.lock:
+            cls.dictations += 1
+            cls.hedges_sent += hedge_sent
+            cls.wins[winner] += 1
+            cls.hedge_wins += hedge_won
+            cls.rescued += rescued
+
+    @classmethod
+    def record_primary_finished(cls, seconds_after_winner, primary_succeeded):
+        """Record how much later than the winning hedge the primary backend answered."""
+        with cls.lock:
+            if primary_succeeded:
+                cls.saved_seconds += seconds_after_winner
+            else:
+                cls.rescued += 1
+        ConfigManager.console_print(f'Hedge: primary answered {seconds_after_winner:.2f} s after the hedge. '
+                                    f'{cls.summary()}')
+
+    @classmethod
+    def summary(cls):
+        with cls.lock:
+            if not cls.dictations:
+                return 'No hedged dictations yet.'
+            return (f'Local won {cls.wins["local"]}/{cls.dictations}, remote won {cls.wins["remote"]}/{cls.dictations}; '
+                    f'hedge sent {cls.hedges_sent} times and won {cls.hedge_wins} times; '
+                    f'{cls.saved_seconds:.2f} s saved in total, {cls.rescued} failures of the primary rescued.')
+
+_hedge_executor = None
+
+def transcribe_hedged(audio_data, local_model=None, streamer=None, sample_rate=16000, trace=None):
+    """
+    Race the local model against the API and return the first plausible transcription.
+
+    The configured backend (the API if use_api is set, otherwise the local model) starts
+    right away. The other one is started if no plausible answer has arrived within
+    hedge_delay milliseconds, or as soon as the first one fails. The slower backend is left
+    to finish in the background; its result is only used to log how much time was saved.
+    """
+    global _hedge_executor
+    if _hedge_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='hedge')
+
+    model_options = ConfigManager.get_config_snapshot().model_options
+    hedge_delay = model_options.hedge_delay / 1000.0
+    audio_seconds = len(audio_data) / sample_rate
+
+    def run_local():
+        if streamer:
+            return streamer.finalize(audio_data)
+        return transcribe_local(audio_data, local_model, trace)
+
+    backends = [('local', run_local), ('remote', lambda: transcribe_api(audio_data, sample_rate, trace))]
+    if model_options.use_api:
+        backends.reverse()
+
+    finished = queue.Queue()
+    start_time = time.perf_counter()
+
+    def launch(name, function):
+        future = _hedge_executor.submit(function)
+        future.add_done_callback(lambda future: finished.put((name, future, time.perf_counter())))
+
+    launch(*backends[0])
+    launched = 1
+    outstanding = 1
+    fallback = None
+    error = None
+    winner = None
+    while outstanding:
+        timeout = max(0.0, start_time + hedge_delay - time.perf_counter()) if launched == 1 else None
+        try:
+            name, future, finish_time = finished.get(timeout=timeout)
+        except queue.Empty:
+            launch(*backends[1])
+            launched, outstanding = 2, outstanding + 1
+            continue
+
+        outstanding -= 1
+        if future.exception() is None and is_plausible_transcription(future.result(), audio_seconds):
+            winner = (name, future.result(), finish_time)
+            break
+        if future.exception() is None:
+            fallback = fallback or future.result()
+        else:
+            error = future.exception()
+        ConfigManager.console_print(f'Hedge: {name} returned no usable transcription '
+                                    f'({future.exception() or "implausible"}).')
+        if launched == 1:
+            launch(*backends[1])
+            launched, outstanding = 2, outstanding + 1
+
+    if winner is None:
+        if fallback is not None:
+            return fallback
+        raise error
+
+    name, text, finish_time = winner
+    hedge_won = name == backends[1][0]
+    HedgeStats.record(name, hedge_won, launched == 2, rescued=hedge_won and not outstanding)
+    if trace is not None:
+        trace.attributes['hedge_winner'] = name
+        trace.attributes['hedge_sent'] = launched == 2
+    ConfigManager.console_print(f'Hedge: {name} won after {finish_time - start_time:.2f} s'
+                                f'{" (hedge)" if hedge_won else ""}. {HedgeStats.summary()}')
+
+    if hedge_won and outstanding:
+        # Find out how long the primary would have taken, without waiting for it
+        def primary_finished():
+            _, future, primary_time = finished.get()
+            HedgeStats.record_primary_finished(primary_time - finish_time,
+                                               future.exception() is None
+                                               and is_plausible_transcription(future.result(), audio_seconds))
+        threading.Thread(target=primary_finished, daemon=True).start()
+
+    return text
+
+def build_trie_pattern(words):
+    """
+    Build a regular expression that matches any of the words, factored into a trie.
+
+    Unlike a plain alternation of all the words, the regex engine only follows the branch of
+    the next character at each level, so matching time does not grow with the number of words.
+    Longer words are tried before their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def to_pattern(node):
+        branches = [re.escape(char) + to_pattern(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return to_pattern(trie)
+
+
+class RuleSet:
+    """
+    Post-processing rules loaded from a YAML rules file, compiled once.
+
+    The file may contain:
+        replacements: a mapping of words or phrases to their replacement, matched as whole
+            words regardless of case (e.g. product names, acronyms, or "new line": "\n")
+        regex: a list of {pattern, replacement} rules applied in order after the replacements
+        casing: 'sentence', 'lower' or 'upper'
+
+    All replacements are matched in a single pass by one trie-shaped regex. The compiled
+    form is cached next to the rules file as JSON, so later starts skip parsing and compiling it.
+    """
+
+    CACHE_VERSION = 2
+    _cache = {}  # Rules file path -> (modification time, RuleSet)
+    _lock = threading.Lock()
+
+    def __init__(self, lookup, pattern, regex_rules, casing):
+        """
+        Initialize the RuleSet from its compiled form.
+
+        :param lookup: Dictionary of lowercased phrases to replacements
+        :param pattern: Regular expression source matching any of the phrases
+        :param regex_rules: List of (pattern, replacement) tuples
+        :param casing: 'sentence', 'lower', 'upper' or None
+        """
+        self.lookup = lookup
+        self.pattern = pattern
+        self.replacement_regex = re.compile(rf'(?<!\w)(?:{pattern})(?!\w)', re.IGNORECASE) if lookup else None
+        self.regex_rules = [(re.compile(rule_pattern), replacement) for rule_pattern, replacement in regex_rules]
+        self.casing = casing
+
+    @classmethod
+    def compile(cls, rules):
+        """
+        Compile the rules parsed from a rules file.
+        """
+        lookup = {}
+        for phrase, replacement in (rules.get('replacements') or {}).items():
+            phrase = ' '.join(str(phrase).split()).lower()
+            if phrase:
+                lookup[phrase] = '' if replacement is None else str(replacement)
+        regex_rules = [(rule['pattern'], rule.get('replacement') or '') for rule in rules.get('regex') or []]
+        return cls(lookup, build_trie_pattern(lookup), regex_rules, rules.get('casing'))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a rules file, using the compiled form cached next to it if the file has not changed.
+        """
+        import yaml
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        cache_path = path + '.cache'
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as file:
+                cached = json.load(file)
+            if cached['version'] == cls.CACHE_VERSION and cached['digest'] == digest:
+                return cls(*cached['rule_set'])
+        except Exception:
+            pass  # Missing, stale or unreadable cache
+
+        rule_set = cls.compile(yaml.safe_load(content) or {})
+        try:
+            with open(cache_path + '.tmp', 'w', encoding='utf-8') as file:
+                json.dump({'version': cls.CACHE_VERSION, 'digest': digest,
+                             'rule_set': (rule_set.lookup, rule_set.pattern,
+                                          [(rule.pattern, replacement) for rule, replacement in rule_set.regex_rules],
+                                          rule_set.casing)}, file)
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError as e:
+            ConfigManager.console_print(f'Could not cache the compiled rules: {e}')
+        return rule_set
+
+    @classmethod
+    def get_rule_set(cls, path):
+        """
+        Return the compiled rules of a rules file, loading it again only if it has changed.
+
+        :return: RuleSet, or None if the file cannot be loaded
+        """
+        with cls._lock:
+            try:
+                modified = os.path.getmtime(path)
+            except OSError:
+                ConfigManager.console_print(f'Rules file {path} not found.')
+                return None
+            cached = cls._cache.get(path)
+            if cached and cached[0] == modified:
+                return cached[1]
+            try:
+                rule_set = cls.from_file(path)
+            except Exception as e:
+                ConfigManager.console_print(f'Could not load the rules file {path}: {e}')
+                rule_set = None
+            cls._cache[path] = (modified, rule_set)
+            return rule_set
+
+    def replace(self, match):
+        return self.lookup.get(' '.join(match.group().split()).lower(), match.group())
+
+    def apply(self, text):
+        if self.replacement_regex is not None:
+            text = self.replacement_regex.sub(self.replace, text)
+        for regex, replacement in self.regex_rules:
+            text = regex.sub(replacement, text)
+        if self.casing == 'lower':
+            text = text.lower()
+        elif self.casing == 'upper':
+            text = text.upper()
+        elif self.casing == 'sentence':
+            text = re.sub(r'(^\s*|[.!?]\s+)([a-z])', lambda match: match.group(1) + match.group(2).upper(), text)
+        return text
 
-    response = local_model.transcribe(audio=audio_data_float,
-                                      language=model_options['common']['language'],
-                                      initial_prompt=model_options['common']['initial_prompt'],
-                                      condition_on_previous_text=model_options['local']['condition_on_previous_text'],
-                                      temperature=model_options['common']['temperature'],
-                                      vad_filter=model_options['local']['vad_filter'],)
-    return ''.join([segment.text for segment in list(response[0])])
 
 def post_process_transcription(transcription):
     """
     Apply post-processing to the transcription.
     """
     transcription = transcription.strip()
-    post_processing = ConfigManager.get_config_section('post_processing')
-    if post_processing['remove_trailing_period'] and transcription.endswith('.'):
+    post_processing = ConfigManager.get_config_snapshot().post_processing
+    if post_processing.rules_file:
+        rule_set = RuleSet.get_rule_set(post_processing.rules_file)
+        if rule_set is not None:
+            transcription = rule_set.apply(transcription).strip()
+    if post_processing.remove_trailing_period and transcription.endswith('.'):
         transcription = transcription[:-1]
-    if post_processing['add_trailing_space']:
+    if post_processing.add_trailing_space:
         transcription += ' '
-    if post_processing['remove_capitalization']:
+    if post_processing.remove_capitalization:
         transcription = transcription.lower()
 
     return transcription
 
-def transcribe(audio_data, local_model=None):
+def transcribe(audio_data, local_model=None, streamer=None, trace=None):
     """
-    Transcribe audio date using the local model.
+    Transcribe audio date using the OpenAI API or a local model, depending on config.
+
+    If a StreamingTranscriber is given, only the tail it has not yet confirmed is decoded.
+    Stage timings are added to the trace, if one is given.
     """
     if audio_data is None:
         return ''
 
-    transcription = transcribe_local(audio_data, local_model)
-    return post_process_transcription(transcription)
+    model_options = ConfigManager.get_config_snapshot().model_options
+    if model_options.hedge:
+        transcription = transcribe_hedged(audio_data, local_model, streamer, trace=trace)
+    elif model_options.use_api:
+        transcription = transcribe_api(audio_data, trace=trace)
+    elif streamer:
+        with Tracer.span(trace, 'model_transcribe'):
+            transcription = streamer.finalize(audio_data)
+    else:
+        transcription = transcribe_local(audio_data, local_model, trace)
+
+    with Tracer.span(trace, 'post_process'):
+        return post_process_transcription(transcription)
 
@@ -0,0 +1,342 @@
+"""
+Local OpenAI-compatible transcription server.
+
+Serves POST /v1/audio/transcriptions with the configured local model, so WhisperWriter
+clients on other machines can point api.base_url at it (e.g. http://host:8000/v1).
+Requests that arrive within a short window are decoded together in one batched model call.
+The number of waiting requests is bounded; when the queue is full the server answers 429 so
+clients back off instead of piling up latency.
+
+Usage: python src/transcription_server.py [--host 0.0.0.0] [--port 8000] [--max-batch-size 8]
+           [--batch-window-ms 20] [--max-queue 32] [--api-key KEY]
+       python src/transcription_server.py --stub-text "Hello." [--stub-delay-ms 500] [--stub-failure-rate 0.2]
+"""
+import argparse
+import io
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+
+from audio_files import load_audio
+from utils import ConfigManager
+
+SAMPLE_RATE = 16000
+# Whisper decodes 30 s windows; longer clips go through the regular long-form transcription
+MAX_BATCH_SAMPLES = 30 * SAMPLE_RATE
+N_FRAMES = 3000
+MAX_PROMPT_TOKENS = 223
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class TranscriptionRequest:
+    """One queued request: the decoded audio, its decoding options and the future for its text."""
+
+    __slots__ = ('audio', 'language', 'prompt', 'temperature', 'future', 'queued_at')
+
+    def __init__(self, audio, language, prompt, temperature):
+        self.audio = audio
+        self.language = language
+        self.prompt = prompt
+        self.temperature = temperature
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+    def batchable(self):
+        # Batched decoding is greedy or beam search; sampling requests go through transcribe()
+        return self.language is not None and self.temperature == 0 and len(self.audio) <= MAX_BATCH_SAMPLES
+
+
+class StubModel:
+    """
+    Stand-in for a WhisperModel that answers with fixed text, for testing API clients
+    without loading a model. Can be made slow or flaky to exercise timeouts and retries.
+    """
+
+    def __init__(self, text, delay_ms=0, failure_rate=0.0):
+        self.text = text
+        self.delay = delay_ms / 1000.0
+        self.failure_rate = failure_rate
+
+    def transcribe(self, audio, **options):
+        time.sleep(self.delay)
+        if random.random() < self.failure_rate:
+            raise RuntimeError('Simulated failure')
+        return [SimpleNamespace(text=self.text)], None
+
+
+class DynamicBatcher:
+    """
+    Group concurrent requests into batched model calls on a single worker thread.
+
+    The worker takes the first waiting request, then keeps collecting requests until the
+    batch is full or the batch window has passed since the first one arrived. Short clips
+    with a known language and temperature 0 are decoded together with one generate() call;
+    the rest are transcribed one by one.
+    """
+
+    def __init__(self, model, max_batch_size=8, batch_window_ms=20, max_queue=32, beam_size=5):
+        """
+        Initialize the DynamicBatcher and start its worker thread.
+
+        :param model: faster_whisper.WhisperModel to decode with
+        :param max_batch_size: Maximum number of requests per model call
+        :param batch_window_ms: How long to wait for more requests after the first one
+        :param max_queue: Maximum number of waiting requests before submit() refuses more
+        :param beam_size: Beam size for decoding
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.beam_size = beam_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.tokenizers = {}
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'batches': 0, 'rejected': 0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, request):
+        """
+        Queue a request and return its future.
+
+        :raises QueueFullError: If max_queue requests are already waiting
+        """
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            with self.stats_lock:
+                self.stats['rejected'] += 1
+            raise QueueFullError()
+        return request.future
+
+    def _collect_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            with self.stats_lock:
+                self.stats['requests'] += len(batch)
+                self.stats['batches'] += 1
+
+            batchable = [request for request in batch if request.batchable()]
+            for request in batch:
+                if not request.batchable():
+                    self._transcribe_single(request)
+            if len(batchable) == 1:
+                self._transcribe_single(batchable[0])
+            elif batchable:
+                try:
+                    texts = self.transcribe_batch(batchable)
+                except Exception as e:
+                    for request in batchable:
+                        request.future.set_exception(e)
+                    continue
+                for request, text in zip(batchable, texts):
+                    request.future.set_result(text)
+
+    def _transcribe_single(self, request):
+        try:
+            segments, _ = self.model.transcribe(request.audio, language=request.language,
+                                                initial_prompt=request.prompt, temperature=request.temperature,
+                                                beam_size=self.beam_size)
+            request.future.set_result(''.join(segment.text for segment in segments))
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def _tokenizer(self, language):
+        from faster_whisper.tokenizer import Tokenizer
+
+        if language not in self.tokenizers:
+            self.tokenizers[language] = Tokenizer(self.model.hf_tokenizer, self.model.model.is_multilingual,
+                                                  task='transcribe', language=language)
+        return self.tokenizers[language]
+
+    def _prompt(self, request):
+        """Build the decoder prompt: optional previous text, then the start-of-transcript sequence."""
+        tokenizer = self._tokenizer(request.language)
+        prompt = []
+        if request.prompt:
+            prompt_tokens = tokenizer.encode(' ' + request.prompt.strip())
+            prompt = [tokenizer.sot_prev] + prompt_tokens[-MAX_PROMPT_TOKENS:]
+        return prompt + list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+
+    def transcribe_batch(self, requests):
+        """
+        Decode up to 30 s clips in a single generate() call.
+
+        :return: List of texts in the order of the requests
+        """
+        import ctranslate2
+
+        # The feature extractor pads each clip with 30 s of silence, so every mel has at least N_FRAMES frames
+        mels = [self.model.feature_extractor(request.audio)[:, :N_FRAMES] for request in requests]
+        features = np.ascontiguousarray(np.stack(mels), dtype=np.float32)
+
+        results = self.model.model.generate(ctranslate2.StorageView.from_array(features),
+                                            [self._prompt(request) for request in requests],
+                                            beam_size=self.beam_size, max_length=448,
+                                            suppress_blank=True, suppress_tokens=[-1])
+        return [self._tokenizer(request.language).decode(result.sequences_ids[0])
+                for request, result in zip(requests, results)]
+
+
+def parse_multipart(content_type, body):
+    """Parse a multipart/form-data body into a dictionary of field name to bytes."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    if not message.is_multipart():
+        raise ValueError('Expected a multipart/form-data body.')
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def create_handler(batcher, api_key=None, default_language=None):
+    """Create the request handler class serving the given batcher."""
+
+    class TranscriptionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_json(handler, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(data)))
+            if status == 429:
+                handler.send_header('Retry-After', '1')
+            handler.end_headers()
+            handler.wfile.write(data)
+
+        def send_error_json(handler, status, message, error_type='invalid_request_error'):
+            handler.send_json(status, {'error': {'message': message, 'type': error_type}})
+
+        def do_GET(handler):
+            if handler.path == '/v1/models':
+                model = ConfigManager.get_config_value('model_options', 'local', 'model')
+                handler.send_json(200, {'object': 'list', 'data': [{'id': model, 'object': 'model'}]})
+            elif handler.path == '/health':
+                with batcher.stats_lock:
+                    stats = dict(batcher.stats)
+                handler.send_json(200, {**stats, 'queued': batcher.queue.qsize()})
+            else:
+                handler.send_error_json(404, f'Unknown path: {handler.path}')
+
+        def do_POST(handler):
+            if handler.path.rstrip('/') != '/v1/audio/transcriptions':
+                handler.send_error_json(404, f'Unknown path: {handler.path}')
+                return
+            if api_key and handler.headers.get('Authorization') != f'Bearer {api_key}':
+                handler.send_error_json(401, 'Invalid API key.', 'authentication_error')
+                return
+
+            def field(name, default=None):
+                value = fields.get(name)
+                return value.decode('utf-8') if value else default
+
+            try:
+                body = handler.rfile.read(int(handler.headers.get('Content-Length', 0)))
+                fields = parse_multipart(handler.headers.get('Content-Type', ''), body)
+                if not fields.get('file'):
+                    raise ValueError('Missing file field.')
+                language = field('language', default_language)
+                prompt = field('prompt')
+                temperature = float(field('temperature', '0'))
+                response_format = field('response_format', 'json')
+                audio = load_audio(io.BytesIO(fields['file']), SAMPLE_RATE)
+            except Exception as e:
+                handler.send_error_json(400, f'Invalid request: {e}')
+                return
+
+            request = TranscriptionRequest(audio, language, prompt, temperature)
+
+            try:
+                text = batcher.submit(request).result()
+            except QueueFullError:
+                handler.send_error_json(429, 'Too many requests are queued. Retry later.', 'rate_limit_error')
+                return
+            except Exception as e:
+                handler.send_error_json(500, f'Transcription failed: {e}', 'server_error')
+                return
+
+            if response_format == 'text':
+                data = text.encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; charset=utf-8')
+                handler.send_header('Content-Length', str(len(data)))
+                handler.end_headers()
+                handler.wfile.write(data)
+            elif response_format == 'verbose_json':
+                handler.send_json(200, {'task': 'transcribe', 'language': request.language,
+                                        'duration': len(audio) / SAMPLE_RATE, 'text': text})
+            else:
+                handler.send_json(200, {'text': text})
+
+        def log_message(handler, format, *args):
+            ConfigManager.console_print(f'{handler.address_string()} {format % args}')
+
+    return TranscriptionHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the local model as an OpenAI-compatible transcription API.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (use 0.0.0.0 to serve other machines)')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=8, help='Maximum requests decoded in one model call')
+    parser.add_argument('--batch-window-ms', type=float, default=20,
+                        help='How long to wait for more requests to batch with the first one')
+    parser.add_argument('--max-queue', type=int, default=32, help='Waiting requests beyond which 429 is returned')
+    parser.add_argument('--beam-size', type=int, default=5)
+    parser.add_argument('--api-key', help='Require this bearer token from clients')
+    parser.add_argument('--stub-text', help='Answer every request with this text instead of loading a model')
+    parser.add_argument('--stub-delay-ms', type=float, default=0, help='Response delay of the stub')
+    parser.add_argument('--stub-failure-rate', type=float, default=0.0,
+                        help='Fraction of stub requests that fail with a 500')
+    args = parser.parse_args()
+
+    ConfigManager.initialize()
+    if args.stub_text is not None:
+        model = StubModel(args.stub_text, args.stub_delay_ms, args.stub_failure_rate)
+        args.max_batch_size = 1
+    else:
+        from model_manager import ModelManager
+        from transcription import create_local_model
+
+        model = create_local_model()
+        ModelManager.warm_up(model)
+
+    batcher = DynamicBatcher(model, args.max_batch_size, args.batch_window_ms, args.max_queue, args.beam_size)
+    handler = create_handler(batcher, args.api_key, ConfigManager.get_config_value('model_options', 'common', 'language'))
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f'Serving transcriptions on http://{args.host}:{args.port}/v1/audio/transcriptions')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
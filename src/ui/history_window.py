@@ -0,0 +1,76 @@
+import sqlite3
+import time
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QLabel, QLineEdit, QListWidget, QListWidgetItem
+
+from history import TranscriptionHistory
+from ui.base_window import BaseWindow
+
+class HistoryWindow(BaseWindow):
+    def __init__(self):
+        """
+        Initialize the history window.
+        """
+        super().__init__('WhisperWriter History', 560, 480)
+        self.initHistoryUI()
+
+    def initHistoryUI(self):
+        """
+        Initialize the history user interface: a search field over a list of results.
+        """
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText('Search transcriptions...')
+        self.search_field.setFont(QFont('Segoe UI', 11))
+        self.search_field.textChanged.connect(lambda: self.search_timer.start())
+        self.main_layout.addWidget(self.search_field)
+
+        self.results_list = QListWidget()
+        self.results_list.setFont(QFont('Segoe UI', 10))
+        self.results_list.setWordWrap(True)
+        self.results_list.itemActivated.connect(self.copy_item)
+        self.main_layout.addWidget(self.results_list)
+
+        self.info_label = QLabel('Double-click a result to copy it to the clipboard.')
+        self.info_label.setFont(QFont('Segoe UI', 9))
+        self.info_label.setStyleSheet("color: #606060;")
+        self.main_layout.addWidget(self.info_label)
+
+        # Search once typing pauses, not on every key press
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.update_results)
+
+    def show(self):
+        """
+        Show the window with the most recent transcriptions.
+        """
+        super().show()
+        self.search_field.setFocus()
+        self.update_results()
+
+    def update_results(self):
+        self.results_list.clear()
+        history = TranscriptionHistory.get_history()
+        if history is None:
+            self.info_label.setText('Transcription history is disabled (save_history).')
+            return
+
+        start = time.perf_counter()
+        try:
+            results = history.search(self.search_field.text(), limit=200)
+        except sqlite3.Error as e:
+            self.info_label.setText(f'Could not search the history: {e}')
+            return
+        elapsed = time.perf_counter() - start
+        for _, timestamp, text, _, _, _ in results:
+            item = QListWidgetItem(f'{time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))}\n{text}')
+            item.setData(Qt.UserRole, text)
+            self.results_list.addItem(item)
+        self.info_label.setText(f'{len(results)} results in {elapsed * 1000:.0f} ms. '
+                                'Double-click a result to copy it to the clipboard.')
+
+    def copy_item(self, item):
+        QApplication.clipboard().setText(item.data(Qt.UserRole))
+        self.info_label.setText('Copied to the clipboard.')
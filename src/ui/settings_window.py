@@ -112,8 +112,8 @@ class SettingsWindow(BaseWindow):
             return self.create_checkbox(current_value, key)
         elif meta_type == 'str' and 'options' in meta:
             return self.create_combobox(current_value, meta['options'])
-        elif meta_type == 'str':
-            return self.create_line_edit(current_value, key)
+        elif meta_type in ['str', 'int|str']:
+            return self.create_line_edit(None if current_value is None else str(current_value), key)
         elif meta_type in ['int', 'float']:
             return self.create_line_edit(str(current_value))
         return None
@@ -174,7 +174,9 @@ class SettingsWindow(BaseWindow):
 
     def save_settings(self):
         """Save the settings to the config file and .env file."""
-        self.iterate_settings(self.save_setting)
+        updates = []
+        self.iterate_settings(lambda w, c, s, k, m: updates.append(self.get_setting_update(w, c, s, k, m)))
+        ConfigManager.set_config_values(updates)
 
         # Save the API key to the .env file
         api_key = ConfigManager.get_config_value('model_options', 'api', 'api_key') or ''
@@ -185,16 +187,14 @@ class SettingsWindow(BaseWindow):
         ConfigManager.set_config_value(None, 'model_options', 'api', 'api_key')
 
         ConfigManager.save_config()
-        QMessageBox.information(self, 'Settings Saved', 'Settings have been saved. The application will now restart.')
+        QMessageBox.information(self, 'Settings Saved', 'Settings have been saved and applied.')
         self.settings_saved.emit()
         self.close()
 
-    def save_setting(self, widget, category, sub_category, key, meta):
+    def get_setting_update(self, widget, category, sub_category, key, meta):
+        """Return the (keys, value) pair of a setting widget, for ConfigManager.set_config_values."""
         value = self.get_widget_value_typed(widget, meta.get('type'))
-        if sub_category:
-            ConfigManager.set_config_value(value, category, sub_category, key)
-        else:
-            ConfigManager.set_config_value(value, category, key)
+        return ((category, sub_category, key) if sub_category else (category, key)), value
 
     def reset_settings(self):
         """Reset the settings to the saved values."""
@@ -240,6 +240,8 @@ class SettingsWindow(BaseWindow):
                 return int(text) if text else None
             elif value_type == 'float':
                 return float(text) if text else None
+            elif value_type == 'int|str' and text.strip().isdigit():
+                return int(text)
             else:
                 return text or None
         elif isinstance(widget, QWidget) and widget.layout():
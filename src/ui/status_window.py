@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QTimer
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 from PyQt5.QtWidgets import QApplication, QLabel, QHBoxLayout
@@ -15,7 +16,7 @@ class StatusWindow(BaseWindow):
         """
         Initialize the status window.
         """
-        super().__init__('WhisperWriter Status', 320, 120)
+        super().__init__('WhisperWriter Status', 320, 140)
         self.initStatusUI()
         self.statusSignal.connect(self.updateStatus)
 
@@ -46,6 +47,20 @@ class StatusWindow(BaseWindow):
         status_layout.addStretch(1)
 
         self.main_layout.addLayout(status_layout)
+
+        self.queue_label = QLabel()
+        self.queue_label.setFont(QFont('Segoe UI', 9))
+        self.queue_label.setStyleSheet("color: #606060;")
+        self.queue_label.setAlignment(Qt.AlignCenter)
+        self.queue_label.hide()
+        self.main_layout.addWidget(self.queue_label)
+
+        self.queue_depth = 0
+        self.oldest_queued_at = 0.0
+        # Refresh the wait time of the oldest queued recording while there is one
+        self.queue_timer = QTimer(self)
+        self.queue_timer.setInterval(250)
+        self.queue_timer.timeout.connect(self.refreshQueue)
         
     def show(self):
         """
@@ -68,6 +83,7 @@ class StatusWindow(BaseWindow):
         """
         Emit the close signal when the window is closed.
         """
+        self.queue_timer.stop()
         self.closeSignal.emit()
         super().closeEvent(event)
 
@@ -83,10 +99,43 @@ class StatusWindow(BaseWindow):
         elif status == 'transcribing':
             self.icon_label.setPixmap(self.pencil_pixmap)
             self.status_label.setText('Transcribing...')
+        elif status == 'loading':
+            self.icon_label.setPixmap(self.pencil_pixmap)
+            self.status_label.setText('Loading model...')
+            self.show()
+        elif status == 'queue_full':
+            self.icon_label.setPixmap(self.pencil_pixmap)
+            self.status_label.setText('Queue full, not recording')
+            self.show()
 
         if status in ('idle', 'error', 'cancel'):
             self.close()
 
+    @pyqtSlot(int, float)
+    def updateQueue(self, depth, oldest_queued_at):
+        """
+        Update the number of recordings waiting for transcription and when the oldest was queued.
+
+        :param depth: Number of recordings waiting for or undergoing transcription
+        :param oldest_queued_at: time.monotonic() at which the oldest of them was queued
+        """
+        self.queue_depth = depth
+        self.oldest_queued_at = oldest_queued_at
+        if depth:
+            self.queue_timer.start()
+        else:
+            self.queue_timer.stop()
+        self.refreshQueue()
+
+    def refreshQueue(self):
+        if not self.queue_depth:
+            self.queue_label.hide()
+            return
+        wait = time.monotonic() - self.oldest_queued_at
+        recordings = 'recording' if self.queue_depth == 1 else 'recordings'
+        self.queue_label.setText(f'{self.queue_depth} {recordings} in queue, oldest waiting {wait:.1f} s')
+        self.queue_label.show()
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -95,6 +144,7 @@ if __name__ == '__main__':
     status_window.show()
 
     # Simulate status updates
+    QTimer.singleShot(1000, lambda: status_window.updateQueue(2, time.monotonic()))
     QTimer.singleShot(3000, lambda: status_window.statusSignal.emit('transcribing'))
     QTimer.singleShot(6000, lambda: status_window.statusSignal.emit('idle'))
     
@@ -12,9 +12,13 @@ class SystemTrayIcon(QSystemTrayIcon):
         tray_menu = QMenu(parent)
 
         settings_action = QAction('Open Settings', self.app)
-        settings_action.triggered.connect(self.app.settings_window.show)
+        settings_action.triggered.connect(self.app.show_settings)
         tray_menu.addAction(settings_action)
 
+        history_action = QAction('Search History', self.app)
+        history_action.triggered.connect(self.app.show_history)
+        tray_menu.addAction(history_action)
+
         show_terminal_action = QAction('Show Terminal', self.app)
         show_terminal_action.triggered.connect(self.show_terminal)
         tray_menu.addAction(show_terminal_action)
@@ -1,8 +1,95 @@
+import bisect
+import time
+
 from PyQt5.QtWidgets import QMainWindow, QLabel, QVBoxLayout, QWidget
-from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSlot
-from PyQt5.QtGui import QFont, QCursor, QGuiApplication
+from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QFont, QFontMetrics, QCursor, QGuiApplication
+
+from utils import ConfigManager
+
+REVEAL_FRAME_MS = 16  # One reveal step per frame (~60 FPS)
+REVEAL_CHARS_PER_SECOND = 100  # Typing speed of the reveal for short results
+MAX_REVEAL_MS = 1500  # Longer results are revealed faster so the reveal never takes longer than this
+FRAME_BUDGET_MS = 8  # If updating the label takes longer than this, the rest is shown at once
+FOLLOW_MIN_INTERVAL_MS = 16  # Cursor tracking rate while the cursor moves (~60 FPS)
+FOLLOW_MAX_INTERVAL_MS = 250  # Cursor tracking backs off to this rate while the cursor is still
+MAX_TEXT_WIDTH = 600  # Width in pixels at which the overlay text wraps
+LABEL_PADDING = (10, 20)  # Horizontal and vertical padding of the label, from its style sheet
+WINDOW_MARGIN = 10
+
+
+class TextLayout:
+    """
+    Wraps text into lines once, so that the size of any revealed prefix can be looked up
+    without laying out the text again.
+
+    The width of each word is cached across texts, so a partial result that grows by a few
+    words only measures the new words.
+    """
+
+    def __init__(self, font):
+        self.metrics = QFontMetrics(font)
+        self.space_width = self.metrics.horizontalAdvance(' ')
+        self.word_widths = {}
+        self.set_text('', MAX_TEXT_WIDTH)
+
+    def measure(self, word):
+        width = self.word_widths.get(word)
+        if width is None:
+            if len(self.word_widths) > 10000:
+                self.word_widths.clear()
+            width = self.word_widths[word] = self.metrics.horizontalAdvance(word)
+        return width
+
+    def set_text(self, text, max_width):
+        """
+        Greedily wrap the text at spaces to at most max_width pixels.
+
+        The wrapped text has the same length as the text, with the spaces at line breaks
+        replaced by newlines, so every prefix of it wraps the same way as the full text.
+        """
+        chars = list(text)
+        self.line_starts = [0]
+        self.line_widths = []  # Widest line up to and including each line
+        widest = 0
+        line_width = 0
+        position = 0
+        for paragraph in text.split('\n'):
+            for i, word in enumerate(paragraph.split(' ')):
+                word_width = self.measure(word) if word else 0
+                if i > 0 and line_width + self.space_width + word_width > max_width and line_width > 0:
+                    # Break the line at the space before this word
+                    chars[position - 1] = '\n'
+                    widest = max(widest, line_width)
+                    self.line_widths.append(widest)
+                    self.line_starts.append(position)
+                    line_width = word_width
+                elif i > 0:
+                    line_width += self.space_width + word_width
+                else:
+                    line_width = word_width
+                position += len(word) + 1
+            if position <= len(text):
+                # A newline in the text itself
+                widest = max(widest, line_width)
+                self.line_widths.append(widest)
+                self.line_starts.append(position)
+                line_width = 0
+        self.line_widths.append(max(widest, line_width))
+        self.wrapped_text = ''.join(chars)
+
+    def size_at(self, index):
+        """Return the (width, height) in pixels of the first index characters."""
+        line = bisect.bisect_right(self.line_starts, index) - 1
+        # Only the partially revealed last line is measured again
+        partial_width = self.metrics.horizontalAdvance(self.wrapped_text[self.line_starts[line]:index])
+        width = max(self.line_widths[line - 1] if line > 0 else 0, partial_width)
+        return width, self.metrics.lineSpacing() * (line + 1)
+
 
 class TransparentWindow(QMainWindow):
+    typingFinished = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
@@ -13,33 +100,73 @@ class TransparentWindow(QMainWindow):
         self.text_label.setFont(QFont('Segoe UI', 12))
         self.text_label.setStyleSheet("background-color: rgba(0, 0, 0, 150); color: white; padding: 10px 5px; border-radius: 10px;")
         self.text_label.setAlignment(Qt.AlignCenter)
-        self.text_label.setWordWrap(True)
+        # Lines are broken by TextLayout, so the label never has to wrap the text itself
+        self.text_label.setWordWrap(False)
+        self.text_layout = TextLayout(self.text_label.font())
 
         layout = QVBoxLayout()
+        layout.setContentsMargins(WINDOW_MARGIN, WINDOW_MARGIN, WINDOW_MARGIN, WINDOW_MARGIN)
         layout.addWidget(self.text_label)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+        # Follows the cursor only while the window is shown, see showEvent() and hideEvent()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.follow_cursor)
-        self.timer.start(16)  # Update position every 16 milliseconds (~60 FPS)
+        self.last_cursor_pos = None
+
+        self.reveal_timer = QTimer(self)
+        self.reveal_timer.setInterval(REVEAL_FRAME_MS)
+        self.reveal_timer.timeout.connect(self.reveal_next_chunk)
+        self.reveal_index = 0
+        self.reveal_start = 0.0
+        self.reveal_rate = REVEAL_CHARS_PER_SECOND
+        self.shown_size = None
 
     @pyqtSlot(str)
     def display_text(self, text):
-        self.text_label.setText("")
-        self.adjust_size()
+        self.set_layout_text("")
+        self.show_prefix(0)
         self.move_near_cursor()
         self.show()
         self.typewrite_text(text)
 
+    @pyqtSlot(str)
+    def display_partial(self, text):
+        self.reveal_timer.stop()
+        self.set_layout_text(text)
+        self.show_prefix(len(text))
+        if not self.isVisible():
+            self.move_near_cursor()
+            self.show()
+
+    def set_layout_text(self, text):
+        screen_width = QGuiApplication.primaryScreen().geometry().width()
+        self.text_layout.set_text(text, min(MAX_TEXT_WIDTH, screen_width // 2))
+
+    def show_prefix(self, index):
+        """Show the first index characters, resizing the window only if their size changed."""
+        self.text_label.setText(self.text_layout.wrapped_text[:index])
+        size = self.text_layout.size_at(index)
+        if size != self.shown_size:
+            self.shown_size = size
+            label_width = size[0] + LABEL_PADDING[0] + 2
+            label_height = size[1] + LABEL_PADDING[1]
+            self.text_label.setFixedSize(label_width, label_height)
+            self.setFixedSize(label_width + 2 * WINDOW_MARGIN, label_height + 2 * WINDOW_MARGIN)
+            if self.isVisible():
+                # The window is placed by its size, so keep it next to the cursor as it grows
+                self.move_near_cursor(self.last_cursor_pos)
+
     def adjust_size(self):
-        self.text_label.adjustSize()
-        self.setFixedSize(self.text_label.sizeHint().width() + 20, self.text_label.sizeHint().height() + 20)
+        self.show_prefix(len(self.text_layout.wrapped_text))
 
-    def move_near_cursor(self):
-        cursor_pos = QCursor.pos()
+    def move_near_cursor(self, cursor_pos=None):
+        if cursor_pos is None:
+            cursor_pos = QCursor.pos()
+        self.last_cursor_pos = cursor_pos
         screen = QGuiApplication.primaryScreen()
         screen_geometry = screen.geometry()
         window_width = self.width()
@@ -58,26 +185,71 @@ class TransparentWindow(QMainWindow):
         self.move(x, y)
 
     def follow_cursor(self):
-        if self.isVisible():
-            self.move_near_cursor()
+        """
+        Move the window with the cursor. The timer runs at full rate while the cursor moves and
+        halves its rate on every tick it stands still.
+        """
+        cursor_pos = QCursor.pos()
+        if cursor_pos != self.last_cursor_pos:
+            self.move_near_cursor(cursor_pos)
+            interval = FOLLOW_MIN_INTERVAL_MS
+        else:
+            interval = min(self.timer.interval() * 2, FOLLOW_MAX_INTERVAL_MS)
+        if interval != self.timer.interval():
+            self.timer.setInterval(interval)
+
+    def showEvent(self, event):
+        self.timer.start(FOLLOW_MIN_INTERVAL_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
 
     def typewrite_text(self, text):
-        interval = 10  # Interval between keystrokes in milliseconds
-
-        def type_next_character(index):
-            if index < len(text):
-                current_text = self.text_label.text()
-                self.text_label.setText(current_text + text[index])
-                self.text_label.adjustSize()  # Adjust the size of the text label
-                self.adjust_size()  # Adjust the size of the window
-                QTimer.singleShot(interval, lambda: type_next_character(index + 1))
-
-        type_next_character(0)
+        """
+        Reveal the text in chunks, one per frame.
+
+        The number of characters revealed follows the elapsed time, so the total work is
+        proportional to the number of frames rather than to the number of characters. Results
+        longer than overlay_instant_reveal_chars are shown at once.
+        """
+        self.reveal_timer.stop()
+        self.set_layout_text(text)
+        instant_chars = ConfigManager.get_config_snapshot().misc.overlay_instant_reveal_chars
+        if not text or (instant_chars and len(text) > instant_chars):
+            self.show_prefix(len(text))
+            self.typingFinished.emit()
+            return
+
+        self.reveal_index = 0
+        self.reveal_start = time.perf_counter()
+        self.reveal_rate = max(REVEAL_CHARS_PER_SECOND, len(text) * 1000 / MAX_REVEAL_MS)
+        self.reveal_timer.start()
+        self.reveal_next_chunk()
+
+    def reveal_next_chunk(self):
+        length = len(self.text_layout.wrapped_text)
+        frame_start = time.perf_counter()
+        index = min(length, max(self.reveal_index + 1, int((frame_start - self.reveal_start) * self.reveal_rate)))
+        if index == self.reveal_index:
+            return
+        self.reveal_index = index
+        self.show_prefix(index)
+
+        if index < length and (time.perf_counter() - frame_start) * 1000 > FRAME_BUDGET_MS:
+            # Updating the label is too slow to keep up; show the rest at once
+            self.reveal_index = length
+            self.show_prefix(length)
+        if self.reveal_index >= length:
+            self.reveal_timer.stop()
+            self.typingFinished.emit()
 
     def reset_window(self):
+        self.reveal_timer.stop()
         self.text_label.setText("")
         self.hide()
 
     def closeEvent(self, event):
         self.hide()
-        event.ignore()
\ No newline at end of file
+        event.ignore()
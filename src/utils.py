@@ -1,13 +1,39 @@
-import yaml
+import copy
+import ctypes
 import os
+import select
+import struct
+import sys
+import threading
+import time
+import traceback
+import yaml
+from collections import namedtuple
+
+# Python types of the value types used in the schema
+SCHEMA_TYPES = {'bool': bool, 'int': int, 'float': float, 'str': str, 'int|str': (int, str)}
+
+
+def deep_update(source, overrides):
+    """Recursively merge the overrides into the source dictionary."""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and key in source:
+            deep_update(source[key], value)
+        else:
+            source[key] = value
+
 
 class ConfigManager:
     _instance = None
+    _subscribers = []
 
     def __init__(self):
         """Initialize the ConfigManager instance."""
         self.config = None
         self.schema = None
+        self.snapshot = None
+        self.section_types = {}
+        self.watcher = None
 
     @classmethod
     def initialize(cls, schema_path=None):
@@ -17,6 +43,7 @@ class ConfigManager:
             cls._instance.schema = cls._instance.load_config_schema(schema_path)
             cls._instance.config = cls._instance.load_default_config()
             cls._instance.load_user_config()
+            cls._instance.snapshot = cls._instance.build_snapshot(cls._instance.config)
 
     @classmethod
     def get_schema(cls):
@@ -53,20 +80,112 @@ class ConfigManager:
                 return None
         return value
 
+    @classmethod
+    def get_config_snapshot(cls):
+        """
+        Get the current configuration as a frozen snapshot with attribute access, e.g.
+        snapshot.model_options.local.model. A snapshot never changes; when the configuration
+        changes, a new one replaces it.
+        """
+        if cls._instance is None:
+            raise RuntimeError("ConfigManager not initialized")
+        return cls._instance.snapshot
+
+    def build_snapshot(self, config):
+        """
+        Validate the configuration against the schema and build a snapshot of it.
+
+        Each section becomes a namedtuple. Values are converted to their schema type; values
+        that cannot be converted are replaced by the schema default.
+        """
+        def build(schema, values, path):
+            fields = {}
+            for key, item in schema.items():
+                value = values.get(key) if isinstance(values, dict) else None
+                if isinstance(item, dict) and 'value' in item:
+                    fields[key] = self.validate_value(item, value, path + (key,))
+                elif isinstance(item, dict):
+                    fields[key] = build(item, value, path + (key,))
+
+            if path not in self.section_types:
+                type_name = ''.join(part.title().replace('_', '') for part in path) + 'Config'
+                self.section_types[path] = namedtuple(type_name, fields)
+            return self.section_types[path](**fields)
+
+        return build(self.schema, config, ())
+
+    @staticmethod
+    def validate_value(item, value, path):
+        """Return the value converted to the type in its schema item, or the default if it is invalid."""
+        default = item['value']
+        if value is None:
+            return default
+
+        expected_type = SCHEMA_TYPES.get(item.get('type'))
+        if expected_type == (int, str):
+            # An index or a name, e.g. sound_device; digits saved as text are still an index
+            if isinstance(value, str) and value.strip().isdigit():
+                return int(value)
+            if isinstance(value, bool) or not isinstance(value, expected_type):
+                print(f'Invalid value {value!r} for {".".join(path)}. Using the default value {default!r}.')
+                return default
+        elif expected_type is not None and not isinstance(value, expected_type):
+            try:
+                if expected_type is bool:
+                    raise ValueError()
+                value = expected_type(value)
+            except (TypeError, ValueError):
+                print(f'Invalid value {value!r} for {".".join(path)}. Using the default value {default!r}.')
+                return default
+        if 'options' in item and value not in item['options']:
+            print(f'Unknown value {value!r} for {".".join(path)}. Expected one of: {", ".join(map(str, item["options"]))}.')
+        return value
+
+    @classmethod
+    def get_config_copy(cls):
+        """Get a deep copy of the whole configuration."""
+        if cls._instance is None:
+            raise RuntimeError("ConfigManager not initialized")
+        return copy.deepcopy(cls._instance.config)
+
+    @staticmethod
+    def diff_config(old_config, new_config, prefix=()):
+        """Return the set of nested key tuples whose values differ between two configurations."""
+        changed = set()
+        for key in set(old_config) | set(new_config):
+            old_value = old_config.get(key)
+            new_value = new_config.get(key)
+            if isinstance(old_value, dict) and isinstance(new_value, dict):
+                changed |= ConfigManager.diff_config(old_value, new_value, prefix + (key,))
+            elif old_value != new_value:
+                changed.add(prefix + (key,))
+        return changed
+
     @classmethod
     def set_config_value(cls, value, *keys):
         """Set a specific configuration value using nested keys."""
+        cls.set_config_values([(keys, value)])
+
+    @classmethod
+    def set_config_values(cls, updates):
+        """
+        Set several configuration values at once, validating the configuration only once.
+
+        :param updates: Iterable of (tuple of nested keys, value) pairs
+        """
         if cls._instance is None:
             raise RuntimeError("ConfigManager not initialized")
 
-        config = cls._instance.config
-        for key in keys[:-1]:
-            if key not in config:
-                config[key] = {}
-            elif not isinstance(config[key], dict):
-                config[key] = {}
-            config = config[key]
-        config[keys[-1]] = value
+        for keys, value in updates:
+            config = cls._instance.config
+            for key in keys[:-1]:
+                if key not in config:
+                    config[key] = {}
+                elif not isinstance(config[key], dict):
+                    config[key] = {}
+                config = config[key]
+            config[keys[-1]] = value
+        cls._instance.snapshot = cls._instance.build_snapshot(cls._instance.config)
 
     @staticmethod
     def load_config_schema(schema_path=None):
@@ -96,28 +215,23 @@ class ConfigManager:
 
     def load_user_config(self, config_path=os.path.join('src', 'config.yaml')):
         """Load user configuration and merge with default config."""
-        def deep_update(source, overrides):
-            for key, value in overrides.items():
-                if isinstance(value, dict) and key in source:
-                    deep_update(source[key], value)
-                else:
-                    source[key] = value
-
         if config_path and os.path.isfile(config_path):
             try:
                 with open(config_path, 'r') as file:
                     user_config = yaml.safe_load(file)
-                    deep_update(self.config, user_config)
+                    deep_update(self.config, user_config or {})
             except yaml.YAMLError:
                 print("Error in configuration file. Using default configuration.")
 
     @classmethod
     def save_config(cls, config_path=os.path.join('src', 'config.yaml')):
-        """Save the current configuration to a YAML file."""
+        """Save the current configuration to a YAML file, replacing it atomically."""
         if cls._instance is None:
             raise RuntimeError("ConfigManager not initialized")
-        with open(config_path, 'w') as file:
+        temp_path = config_path + '.tmp'
+        with open(temp_path, 'w') as file:
             yaml.dump(cls._instance.config, file, default_flow_style=False)
+        os.replace(temp_path, config_path)
 
     @classmethod
     def reload_config(cls):
@@ -128,6 +242,53 @@ class ConfigManager:
             raise RuntimeError("ConfigManager not initialized")
         cls._instance.config = cls._instance.load_default_config()
         cls._instance.load_user_config()
+        cls._instance.snapshot = cls._instance.build_snapshot(cls._instance.config)
+
+    @classmethod
+    def subscribe(cls, callback):
+        """
+        Call callback(old_snapshot, new_snapshot) whenever the config file is reloaded by the watcher.
+        The callback runs on the watcher thread.
+        """
+        cls._subscribers.append(callback)
+
+    @classmethod
+    def watch_config_file(cls, config_path=os.path.join('src', 'config.yaml')):
+        """Start reloading the configuration whenever the config file changes on disk."""
+        if cls._instance is None:
+            raise RuntimeError("ConfigManager not initialized")
+        if cls._instance.watcher is None:
+            cls._instance.watcher = FileWatcher(config_path, lambda: cls.reload_changed_config(config_path))
+            cls._instance.watcher.start()
+
+    @classmethod
+    def reload_changed_config(cls, config_path=os.path.join('src', 'config.yaml')):
+        """
+        Reload the config file, swap in the new configuration and snapshot and notify the subscribers.
+        A file that cannot be parsed (e.g. while it is being edited) leaves the configuration unchanged.
+        """
+        instance = cls._instance
+        try:
+            with open(config_path, 'r') as file:
+                user_config = yaml.safe_load(file) or {}
+        except (OSError, yaml.YAMLError) as e:
+            print(f'Could not reload the configuration file ({e}). Keeping the current configuration.')
+            return
+
+        config = instance.load_default_config()
+        deep_update(config, user_config)
+        if config == instance.config:
+            return
+
+        old_snapshot = instance.snapshot
+        instance.config = config
+        instance.snapshot = instance.build_snapshot(config)
+        cls.console_print('Configuration file changed. Reloaded the configuration.')
+        for callback in list(cls._subscribers):
+            try:
+                callback(old_snapshot, instance.snapshot)
+            except Exception:
+                traceback.print_exc()
 
     @classmethod
     def config_file_exists(cls):
@@ -138,5 +299,92 @@ class ConfigManager:
     @classmethod
     def console_print(cls, message):
         """Print a message to the console if enabled in the configuration."""
-        if cls._instance and cls._instance.config['misc']['print_to_terminal']:
+        if cls._instance and cls._instance.snapshot.misc.print_to_terminal:
             print(message)
+
+
+class FileWatcher(threading.Thread):
+    """
+    Call a callback whenever a file has been rewritten.
+
+    On Linux this blocks on inotify, so the thread only wakes up when something in the
+    file's directory is written. Elsewhere, or if inotify is unavailable, the file's
+    modification time is polled.
+    """
+
+    # Event masks from <sys/inotify.h>
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, path, callback, poll_interval=2.0, settle_time=0.1):
+        """
+        Initialize the FileWatcher.
+
+        :param path: File to watch; it does not need to exist yet
+        :param callback: Called without arguments from the watcher thread
+        :param poll_interval: Seconds between checks when polling
+        :param settle_time: Seconds without further writes to wait before calling the callback
+        """
+        super().__init__(daemon=True)
+        self.path = os.path.abspath(path)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+
+    def run(self):
+        if sys.platform.startswith('linux'):
+            try:
+                self._watch_inotify()
+                return
+            except (OSError, AttributeError) as e:
+                print(f'Cannot use inotify ({e}). Polling {self.path} for changes instead.')
+        self._watch_polling()
+
+    def _watch_inotify(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # Watch the directory, since saving by renaming a temporary file replaces the watched file
+        directory = os.fsencode(os.path.dirname(self.path))
+        if libc.inotify_add_watch(fd, directory, self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+
+        name = os.fsencode(os.path.basename(self.path))
+        while True:
+            if not self._read_events(fd, name):
+                continue
+            # Editors may write in several steps; wait until the file has settled
+            while select.select([fd], [], [], self.settle_time)[0]:
+                os.read(fd, 4096)
+            self.callback()
+
+    def _read_events(self, fd, name):
+        """Block until inotify events arrive and check whether any of them concern the watched file."""
+        data = os.read(fd, 4096)
+        offset = 0
+        matched = False
+        while offset + self.EVENT_HEADER.size <= len(data):
+            _, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            matched |= data[offset:offset + length].rstrip(b'\0') == name
+            offset += length
+        return matched
+
+    def _watch_polling(self):
+        last_state = self._file_state()
+        while True:
+            time.sleep(self.poll_interval)
+            state = self._file_state()
+            if state != last_state:
+                last_state = state
+                self.callback()
+
+    def _file_state(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
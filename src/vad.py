@@ -0,0 +1,299 @@
+import os
+import threading
+import numpy as np
+
+from tracing import Tracer
+
+
+class VADEngine:
+    """
+    Base class for voice activity detectors.
+
+    Engines classify a batch of equally sized int16 frames at once, so that vectorized
+    detectors can process the whole batch in a single numpy operation.
+    """
+
+    def is_speech_batch(self, frames):
+        """
+        Classify a batch of frames.
+
+        :param frames: 2-D int16 array of shape (number of frames, frame size)
+        :return: 1-D boolean array, True for frames that contain speech
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Reset any streaming state before a new recording."""
+        pass
+
+
+class WebRTCVAD(VADEngine):
+    """
+    Voice activity detection with the WebRTC VAD. Frames must be 10, 20 or 30 ms long.
+    """
+
+    def __init__(self, aggressiveness, sample_rate):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def is_speech_batch(self, frames):
+        return np.fromiter((self.vad.is_speech(frame.tobytes(), self.sample_rate) for frame in frames),
+                           dtype=bool, count=len(frames))
+
+
+class EnergyVAD(VADEngine):
+    """
+    A cheap, fully vectorized detector based on frame energy and zero-crossing rate.
+
+    Frames quieter than the energy threshold are silence. Frames with a zero-crossing rate
+    above the limit are treated as broadband noise (e.g. hiss or fans) rather than voice.
+    """
+
+    def __init__(self, threshold_db, max_zero_crossing_rate=None):
+        """
+        Initialize the EnergyVAD.
+
+        :param threshold_db: Minimum frame RMS level in dBFS for a frame to count as speech
+        :param max_zero_crossing_rate: Maximum fraction of sign changes per sample, or None to disable
+        """
+        self.threshold = np.float32(32768.0 * 10 ** (threshold_db / 20.0)) ** 2
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+
+    def is_speech_batch(self, frames):
+        samples = frames.astype(np.float32)
+        speech = np.einsum('ij,ij->i', samples, samples) / frames.shape[1] >= self.threshold
+
+        if self.max_zero_crossing_rate is not None:
+            signs = np.signbit(frames)
+            crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+            speech &= crossings <= self.max_zero_crossing_rate * (frames.shape[1] - 1)
+        return speech
+
+
+class SileroVAD(VADEngine):
+    """
+    Streaming Silero VAD running on onnxruntime.
+
+    The model consumes fixed 512-sample windows, so incoming frames are re-chunked and each
+    frame is labelled with the most recent speech probability. Both the v4 (h/c state) and
+    v5 (single state with 64 samples of context) exports are supported.
+    """
+
+    window_size = 512
+    context_size = 64
+
+    def __init__(self, aggressiveness, sample_rate, model_path=None):
+        import onnxruntime
+
+        if sample_rate != 16000:
+            raise ValueError('Silero VAD requires a sample rate of 16000 Hz.')
+
+        if not model_path:
+            from faster_whisper.utils import get_assets_path
+            model_path = os.path.join(get_assets_path(), 'silero_vad.onnx')
+
+        options = onnxruntime.SessionOptions()
+        options.inter_op_num_threads = 1
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=['CPUExecutionProvider'])
+        self.is_v5 = 'state' in {model_input.name for model_input in self.session.get_inputs()}
+        self.threshold = 0.35 + 0.1 * aggressiveness
+        self.sample_rate = np.array(sample_rate, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.probability = 0.0
+        if self.is_v5:
+            self.state = np.zeros((2, 1, 128), dtype=np.float32)
+            self.context = np.zeros((1, self.context_size), dtype=np.float32)
+        else:
+            self.h = np.zeros((2, 1, 64), dtype=np.float32)
+            self.c = np.zeros((2, 1, 64), dtype=np.float32)
+
+    def is_speech_batch(self, frames):
+        speech = np.empty(len(frames), dtype=bool)
+        for index, frame in enumerate(frames):
+            self.pending = np.concatenate((self.pending, frame.astype(np.float32) / 32768.0))
+            while len(self.pending) >= self.window_size:
+                self.probability = self._run_window(self.pending[:self.window_size])
+                self.pending = self.pending[self.window_size:]
+            speech[index] = self.probability >= self.threshold
+        return speech
+
+    def _run_window(self, window):
+        window = window[np.newaxis, :]
+        if self.is_v5:
+            window = np.concatenate((self.context, window), axis=1)
+            output, self.state = self.session.run(None, {'input': window, 'state': self.state, 'sr': self.sample_rate})
+            self.context = window[:, -self.context_size:]
+        else:
+            output, self.h, self.c = self.session.run(None, {'input': window, 'h': self.h, 'c': self.c, 'sr': self.sample_rate})
+        return float(output.ravel()[0])
+
+
+class GatedVAD(VADEngine):
+    """
+    Run a cheap pre-gate over the whole batch and the classifier only on frames that pass it.
+    """
+
+    def __init__(self, gate, classifier):
+        self.gate = gate
+        self.classifier = classifier
+
+    def is_speech_batch(self, frames):
+        speech = self.gate.is_speech_batch(frames)
+        if speech.any():
+            speech[speech] = self.classifier.is_speech_batch(frames[speech])
+        return speech
+
+    def reset(self):
+        self.gate.reset()
+        self.classifier.reset()
+
+
+def create_vad_engine(recording_options, sample_rate):
+    """
+    Create the VAD engine selected in the recording options.
+    """
+    engine = recording_options.get('vad_engine') or 'webrtc'
+    aggressiveness = recording_options.get('vad_aggressiveness')
+    aggressiveness = 2 if aggressiveness is None else min(max(aggressiveness, 0), 3)
+
+    if engine == 'energy':
+        return EnergyVAD(threshold_db=-50 + 5 * aggressiveness, max_zero_crossing_rate=0.5 - 0.05 * aggressiveness)
+
+    if engine == 'silero':
+        classifier = SileroVAD(aggressiveness, sample_rate, recording_options.get('vad_model_path'))
+    else:
+        classifier = WebRTCVAD(aggressiveness, sample_rate)
+
+    if recording_options.get('vad_pre_gate'):
+        # Only skip frames that are clearly silent; the classifier makes the real decision
+        return GatedVAD(EnergyVAD(threshold_db=-60), classifier)
+    return classifier
+
+
+class Endpointer:
+    """
+    Finds the end of each utterance in a stream of per-frame speech decisions.
+
+    An utterance ends once speech has been followed by silence_duration of silence.
+    Silence before the first speech frame never ends an utterance.
+    """
+
+    def __init__(self, frame_ms, silence_duration_ms):
+        self.silence_frames = max(1, int(silence_duration_ms / frame_ms))
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.trailing_silence = 0
+
+    def update(self, speech):
+        """
+        Consume frame decisions up to the end of the current utterance.
+
+        :param speech: 1-D boolean array of speech decisions
+        :return: Index of the frame that ends the utterance, or None if it has not ended
+                 within these frames. The caller passes the remaining frames in again.
+        """
+        for index, is_speech in enumerate(speech):
+            if is_speech:
+                self.in_speech = True
+                self.trailing_silence = 0
+            elif self.in_speech:
+                self.trailing_silence += 1
+                if self.trailing_silence >= self.silence_frames:
+                    self.reset()
+                    return index
+        return None
+
+
+class VADWorker(threading.Thread):
+    """
+    A worker thread that runs voice activity detection off the audio callback.
+
+    The audio callback only copies samples into the ring buffer and calls notify(). The
+    worker wakes once a batch of frames is pending, classifies the whole batch and appends
+    the speech frames to the recording.
+    """
+
+    def __init__(self, engine, audio_buffer, recording, frame_size, batch_frames=5, trace=None,
+                 endpointer=None, on_endpoint=None):
+        """
+        Initialize the VADWorker.
+
+        :param engine: VADEngine used to classify frames
+        :param audio_buffer: RingBuffer written by the audio callback
+        :param recording: AudioArena that receives the speech frames
+        :param frame_size: Number of samples per frame
+        :param batch_frames: Number of frames to collect before waking up
+        :param trace: Trace that receives the VAD and conversion timings
+        :param endpointer: Endpointer that finds the end of each utterance, if any
+        :param on_endpoint: Called on the worker thread at the end of each utterance, once its
+                            frames are in the recording and before any later frames are added
+        """
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.audio_buffer = audio_buffer
+        self.recording = recording
+        self.frame_size = frame_size
+        self.batch_samples = frame_size * batch_frames
+        self.data_ready = threading.Event()
+        self.stopped = False
+        self.trace = trace
+        self.endpointer = endpointer
+        self.on_endpoint = on_endpoint
+
+    def notify(self):
+        """Called by the audio callback after each write; wakes the worker once a batch is ready."""
+        if self.audio_buffer.available() >= self.batch_samples:
+            self.data_ready.set()
+
+    def stop(self):
+        """Process the remaining complete frames and wait for the worker to finish."""
+        self.stopped = True
+        self.data_ready.set()
+        self.join()
+
+    def run(self):
+        self.engine.reset()
+        if self.endpointer:
+            self.endpointer.reset()
+        while True:
+            self.data_ready.wait()
+            self.data_ready.clear()
+            self.process_pending()
+            if self.stopped:
+                # stop() may have been called while the batch above was read; take the frames written since
+                self.process_pending()
+                return
+
+    def process_pending(self):
+        """Classify all complete frames in the ring buffer and keep the speech frames."""
+        frame_count = self.audio_buffer.available() // self.frame_size
+        if not frame_count:
+            return
+
+        frames = self.audio_buffer.read(frame_count * self.frame_size).reshape(frame_count, self.frame_size)
+        with Tracer.span(self.trace, 'vad'):
+            speech = self.engine.is_speech_batch(frames)
+
+        start = 0
+        while self.endpointer:
+            end = self.endpointer.update(speech[start:])
+            if end is None:
+                break
+            end += start + 1
+            self.append_speech(frames[start:end], speech[start:end])
+            self.on_endpoint()
+            start = end
+        self.append_speech(frames[start:], speech[start:])
+
+    def append_speech(self, frames, speech):
+        if speech.any():
+            with Tracer.span(self.trace, 'int16_to_float'):
+                self.recording.append(frames[speech].ravel())
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from utils import ConfigManager
+
+SOUND_DEVICE = {'value': None, 'type': 'int|str'}
+PATH = ('recording_options', 'sound_device')
+
+
+def test_int_or_str_keeps_a_device_index():
+    assert ConfigManager.validate_value(SOUND_DEVICE, 3, PATH) == 3
+
+
+def test_int_or_str_parses_an_index_saved_as_text():
+    assert ConfigManager.validate_value(SOUND_DEVICE, '3', PATH) == 3
+
+
+def test_int_or_str_keeps_a_device_name():
+    assert ConfigManager.validate_value(SOUND_DEVICE, 'USB Audio', PATH) == 'USB Audio'
+
+
+def test_int_or_str_rejects_other_types():
+    assert ConfigManager.validate_value(SOUND_DEVICE, 2.5, PATH) is None
+    assert ConfigManager.validate_value(SOUND_DEVICE, True, PATH) is None
+
+
+def test_missing_value_uses_the_default():
+    assert ConfigManager.validate_value({'value': 16000, 'type': 'int'}, None, ('recording_options', 'sample_rate')) == 16000
+
+
+def test_values_are_converted_to_the_schema_type():
+    assert ConfigManager.validate_value({'value': 100, 'type': 'int'}, '250', ('recording_options', 'min_duration')) == 250
+    assert ConfigManager.validate_value({'value': 'base', 'type': 'str'}, 'small', ('model_options', 'local', 'model')) == 'small'
+
+
+def test_invalid_values_use_the_default():
+    assert ConfigManager.validate_value({'value': 100, 'type': 'int'}, 'long', ('recording_options', 'min_duration')) == 100
+    assert ConfigManager.validate_value({'value': False, 'type': 'bool'}, 'yes', ('misc', 'print_to_terminal')) is False
+
+
+def test_set_config_values_applies_every_update():
+    ConfigManager.initialize()
+    ConfigManager.set_config_values([(('recording_options', 'min_duration'), 250),
+                                     (('recording_options', 'sound_device'), '2')])
+    snapshot = ConfigManager.get_config_snapshot()
+    assert snapshot.recording_options.min_duration == 250
+    assert snapshot.recording_options.sound_device == 2